@@ -0,0 +1,10 @@
+"""
+Filename: __main__.py
+Description: entry point for python -m library
+"""
+
+import sys
+
+from library.cli import main
+
+sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Filename: async_api_interface.py
+Description: asyncio interface to the OpenLibrary API with bounded concurrency
+"""
+
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from library.ext_api_interface import Books_API
+
+class AsyncBooks_API:
+    """Coroutine version of Books_API for running many lookups at once.
+
+    Each lookup runs the matching Books_API method on a worker thread, so the
+    connection pool, response cache and request coalescing are shared with the
+    synchronous interface. At most `concurrency` lookups are in flight.
+    """
+
+    CONCURRENCY = 10
+    QUERY_METHODS = ('is_book_available', 'books_by_author', 'get_book_info', 'get_ebooks')
+
+    def __init__(self, api=None, concurrency=None):
+        """Constructor for the AsyncBooks_API class.
+
+        :param api: the Books_API used for the lookups, a new one is created if None
+        :param concurrency: the maximum number of lookups in flight at once
+        """
+        self.concurrency = concurrency if concurrency is not None else self.CONCURRENCY
+        self.api = api if api is not None else Books_API(pool_size=self.concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _run(self, func, *args):
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    async def is_book_available(self, book):
+        """Determines if a given book is available to borrow.
+
+        :param book: the title of the book
+        :returns: True if available, False if not
+        """
+        return await self._run(self.api.is_book_available, book)
+
+    async def books_by_author(self, author):
+        """Gets all the books written by a given author.
+
+        :param author: the name of the author
+        :returns: the titles of all the books in a list form
+        """
+        return await self._run(self.api.books_by_author, author)
+
+    async def get_book_info(self, book):
+        """Gets the information for a given book.
+
+        :param book: the title of the book
+        :returns: a list of dictionaries with book data
+        """
+        return await self._run(self.api.get_book_info, book)
+
+    async def get_ebooks(self, book):
+        """Gets the ebooks for a given book.
+
+        :param book: the title of the book
+        :returns: data about the ebooks
+        """
+        return await self._run(self.api.get_ebooks, book)
+
+    async def gather(self, method, titles, return_exceptions=False):
+        """Runs one query method for many titles concurrently.
+
+        :param method: the name of the query method, e.g. 'get_book_info'
+        :param titles: the titles (or authors) to look up
+        :param return_exceptions: if True, a failed lookup's exception is put in its slot
+            instead of being raised
+        :returns: the results in the same order as titles
+        """
+        if method not in self.QUERY_METHODS:
+            raise ValueError("Unknown query method: %s" % method)
+        query = getattr(self, method)
+        return await asyncio.gather(*[query(title) for title in titles],
+                                    return_exceptions=return_exceptions)
+
+    def close(self):
+        """Shuts down the worker threads and closes the HTTP session."""
+        self._executor.shutdown(wait=True)
+        self.api.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
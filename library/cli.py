@@ -0,0 +1,243 @@
+"""
+Filename: cli.py
+Description: command-line tool for importing and exporting patrons
+
+Usage:
+    python -m library import patrons.csv [--db db.json] [--chunk-size 5000]
+    python -m library export patrons.jsonl [--db library.sqlite3]
+    python -m library snapshot db.snapshot [--db db.json]
+
+CSV and JSONL are streamed in both directions and imports are committed one
+chunk at a time, so the file is never held in memory. A .json database,
+the default --db, is itself loaded whole and rewritten on every chunk;
+give an SQLite file as --db for large imports, whose memory use then does
+not depend on the number of patrons. Rows that are not valid patrons are
+reported by line number and skipped.
+snapshot writes the read-only binary snapshot used by SnapshotPatronStore,
+and a .snapshot file can be given as --db to export from it.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+
+from library.library_db_interface import Library_DB
+from library.patron import Patron, InvalidNameException
+from library.patron_store import TinyDBPatronStore
+from library.snapshot_store import SnapshotPatronStore
+from library.sqlite_patron_store import SQLitePatronStore
+
+FIELDS = ['memberID', 'fname', 'lname', 'age', 'borrowed_books']
+CHUNK_SIZE = 5000
+
+
+def open_db(path):
+    """Opens the patron database, choosing the backend from the file extension.
+
+    :param path: a .json path for TinyDB, .snapshot for a read-only snapshot, anything else for SQLite
+    :returns: the Library_DB
+    """
+    if path.endswith('.json'):
+        return Library_DB(store=TinyDBPatronStore(path))
+    if path.endswith('.snapshot'):
+        return Library_DB(store=SnapshotPatronStore(path))
+    return Library_DB(store=SQLitePatronStore(path))
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith('.jsonl') or path.endswith('.ndjson'):
+        return 'jsonl'
+    raise SystemExit("Cannot tell the format of %s, use --format csv or --format jsonl" % path)
+
+
+def read_rows(file, fmt):
+    """Yields patron rows from a CSV or JSONL file with their line numbers.
+
+    In CSV the borrowed_books column, if present, holds a JSON list. A row
+    that cannot be decoded is yielded as None, for import_patrons to count
+    as invalid.
+
+    :param file: the open text file
+    :param fmt: 'csv' or 'jsonl'
+    :returns: a generator of (line number, row dictionary) pairs
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            try:
+                books = row.get('borrowed_books')
+                row['borrowed_books'] = json.loads(books) if books else []
+            except ValueError:
+                row = None
+            else:
+                if (row.get('age') or '').isdigit():
+                    row['age'] = int(row['age'])
+            yield reader.line_num, row
+    else:
+        for line_num, line in enumerate(file, 1):
+            if line.strip():
+                try:
+                    yield line_num, json.loads(line)
+                except ValueError:
+                    yield line_num, None
+
+
+def write_rows(file, fmt, records):
+    """Writes patron records to a CSV or JSONL file as they are produced.
+
+    :param file: the open text file
+    :param fmt: 'csv' or 'jsonl'
+    :param records: an iterable of patron records
+    :returns: a generator yielding once per record written
+    """
+    if fmt == 'csv':
+        writer = csv.DictWriter(file, fieldnames=FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for record in records:
+            writer.writerow(dict(record, borrowed_books=json.dumps(record['borrowed_books'])))
+            yield record
+    else:
+        for record in records:
+            file.write(json.dumps({field: record[field] for field in FIELDS}) + '\n')
+            yield record
+
+
+def to_patron(row):
+    """Builds a Patron, with their borrowed books, from an imported row.
+
+    :param row: the row dictionary
+    :returns: the Patron
+    """
+    if not isinstance(row, dict):
+        raise ValueError("not a patron record")
+    for field in ('memberID', 'fname', 'lname', 'age'):
+        if row.get(field) in (None, ''):
+            raise ValueError("%s is missing" % field)
+    if not isinstance(row['age'], int) or isinstance(row['age'], bool):
+        raise ValueError("age %r is not a whole number" % (row['age'],))
+    if not isinstance(row.get('borrowed_books') or [], list):
+        raise ValueError("borrowed_books is not a list")
+    patron = Patron(row['fname'], row['lname'], row['age'], row['memberID'])
+    for book in row.get('borrowed_books') or []:
+        patron.add_borrowed_book(book)
+    return patron
+
+
+class Progress:
+    """Reports rows handled and rows per second to stderr."""
+
+    def __init__(self, verb, stream=None):
+        self.verb = verb
+        self.stream = stream if stream is not None else sys.stderr
+        self.start = time.perf_counter()
+        self.rows = 0
+
+    def update(self, rows, detail=''):
+        self.rows += rows
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        self.stream.write("%s %d rows%s, %.0f rows/s\n" % (self.verb, self.rows, detail, self.rows / elapsed))
+        self.stream.flush()
+
+
+def import_patrons(db, rows, chunk_size=CHUNK_SIZE, progress=None):
+    """Imports patron rows, committing one chunk at a time.
+
+    Rows with an invalid name, a missing field or a malformed value are
+    counted, reported to stderr with their line number and skipped.
+
+    :param db: the Library_DB
+    :param rows: an iterable of (line number, row dictionary) pairs, as read_rows yields
+    :param chunk_size: the number of rows per commit
+    :param progress: the Progress to report to, or None
+    :returns: a dictionary with the number of rows 'inserted', 'skipped' and 'invalid'
+    """
+    totals = {'inserted': 0, 'skipped': 0, 'invalid': 0}
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return totals
+        patrons = []
+        for line_num, row in chunk:
+            try:
+                patrons.append(to_patron(row))
+            except (InvalidNameException, KeyError, TypeError, ValueError) as e:
+                totals['invalid'] += 1
+                print("line %d skipped: %s" % (line_num, e), file=sys.stderr)
+        result = db.insert_patrons(patrons)
+        totals['inserted'] += len(result['inserted'])
+        totals['skipped'] += len(result['skipped'])
+        if progress:
+            progress.update(len(chunk), " (%(inserted)d inserted, %(skipped)d skipped, %(invalid)d invalid)" % totals)
+
+
+def export_patrons(db, file, fmt, chunk_size=CHUNK_SIZE, progress=None):
+    """Exports every patron, streaming them from the database.
+
+    :param db: the Library_DB
+    :param file: the open text file
+    :param fmt: 'csv' or 'jsonl'
+    :param chunk_size: the number of rows between progress reports
+    :param progress: the Progress to report to, or None
+    :returns: the number of patrons exported
+    """
+    count = 0
+    for _ in write_rows(file, fmt, db.iter_patron_records(chunk_size)):
+        count += 1
+        if progress and count % chunk_size == 0:
+            progress.update(chunk_size)
+    if progress and count % chunk_size:
+        progress.update(count % chunk_size)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m library', description="Import or export library patrons.")
+    parser.add_argument('command', choices=['import', 'export', 'snapshot'])
+    parser.add_argument('file', help="the CSV or JSONL file, - for stdin/stdout, or the snapshot file")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="defaults to the file extension")
+    parser.add_argument('--db', default=Library_DB.DATABASE_FILE,
+                        help="the database, a .json file for TinyDB, a read-only .snapshot or anything else for SQLite")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="rows per commit/progress report")
+    parser.add_argument('--quiet', action='store_true', help="do not report progress")
+    args = parser.parse_args(argv)
+
+    if args.command == 'snapshot':
+        db = open_db(args.db)
+        try:
+            count = db.export_snapshot(args.file)
+        finally:
+            db.close_db()
+        print("%d written to %s" % (count, args.file), file=sys.stderr)
+        return 0
+
+    fmt = detect_format(args.file, args.format)
+    progress = None if args.quiet else Progress('imported' if args.command == 'import' else 'exported')
+    db = open_db(args.db)
+    try:
+        if args.command == 'import':
+            file = sys.stdin if args.file == '-' else open(args.file, newline='', encoding='utf-8')
+            try:
+                totals = import_patrons(db, read_rows(file, fmt), args.chunk_size, progress)
+            finally:
+                if file is not sys.stdin:
+                    file.close()
+            print("%(inserted)d inserted, %(skipped)d skipped, %(invalid)d invalid" % totals, file=sys.stderr)
+        else:
+            file = sys.stdout if args.file == '-' else open(args.file, 'w', newline='', encoding='utf-8')
+            try:
+                count = export_patrons(db, file, fmt, args.chunk_size, progress)
+            finally:
+                if file is not sys.stdout:
+                    file.close()
+            print("%d exported" % count, file=sys.stderr)
+    finally:
+        db.close_db()
+    return 0
@@ -4,37 +4,212 @@ Description: module used for interacting with a web service
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+from library.response_cache import ResponseCache, normalize_url
+from library.single_flight import SingleFlight
+from library.json_stream import iter_array_items
+from concurrent.futures import ThreadPoolExecutor
+
+_MISSING = object()
+
+def iter_ebooks(docs):
+    """Yields the ebook data for the docs that have at least one ebook.
+
+    :param docs: an iterable of search docs
+    :returns: a generator of ebook dictionaries
+    """
+    for book in docs:
+        if book['ebook_count_i'] >= 1:
+            yield {'title': book['title'], 'ebook_count': book['ebook_count_i']}
+
+class BookSearchResult:
+    """The docs returned by one title search, shared by every accessor for that title."""
+
+    def __init__(self, docs):
+        """Constructor for the BookSearchResult class.
+
+        :param docs: the docs list of the search response
+        """
+        self.docs = docs
+
+    @classmethod
+    def from_json(cls, json_data):
+        """Builds a result from a search response.
+
+        :param json_data: the JSON body of the response, or None
+        :returns: the BookSearchResult, empty if there was no response
+        """
+        if not json_data:
+            return cls([])
+        return cls(json_data['docs'])
+
+    def is_available(self):
+        """Determines if the search found any book.
+
+        :returns: True if available, False if not
+        """
+        return len(self.docs) >= 1
+
+    def get_book_info(self):
+        """Gets the information for every book found.
+
+        :returns: a list of dictionaries with book data
+        """
+        books_info = []
+        for book in self.docs:
+            info = {'title': book['title']}
+            if 'publisher' in book:
+                info.update({'publisher': book['publisher']})
+            if 'publish_year' in book:
+                info.update({'publish_year': book['publish_year']})
+            if 'language' in book:
+                info.update({'language': book['language']})
+            books_info.append(info)
+        return books_info
+
+    def get_ebooks(self):
+        """Gets the ebooks among the books found.
+
+        :returns: data about the ebooks
+        """
+        return list(iter_ebooks(self.docs))
 
 class Books_API:
     """Class used for interacting with the OpenLibrary API."""
 
     API_URL = "http://openlibrary.org/search.json"
+    POOL_SIZE = 10
+    CONNECT_TIMEOUT = 3.05
+    READ_TIMEOUT = 10
+    MAX_RESULTS = 100
+    STREAM_CHUNK_SIZE = 64 * 1024
+    # only the doc keys each kind of search reads are requested from the server
+    BOOK_FIELDS = ('title', 'publisher', 'publish_year', 'language', 'ebook_count_i')
+    AUTHOR_FIELDS = ('title_suggest',)
+
+    def __init__(self, session=None, pool_size=None, connect_timeout=None, read_timeout=None,
+                 cache=None, max_results=None):
+        """Constructor for the Books_API class.
+
+        Requests go through a single keep-alive session so repeated lookups
+        reuse pooled connections instead of opening a new one every time.
+
+        :param session: the requests.Session to use, a new one is created if None
+        :param pool_size: the number of connections kept alive per host
+        :param connect_timeout: seconds to wait for a connection to be established
+        :param read_timeout: seconds to wait for the server to send a response
+        :param cache: the ResponseCache for search responses, a default one is created if None
+        :param max_results: the maximum number of docs requested per search
+        """
+        self.pool_size = pool_size if pool_size is not None else self.POOL_SIZE
+        self.connect_timeout = connect_timeout if connect_timeout is not None else self.CONNECT_TIMEOUT
+        self.read_timeout = read_timeout if read_timeout is not None else self.READ_TIMEOUT
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.cache = cache if cache is not None else ResponseCache()
+        self.in_flight = SingleFlight()
+        self.max_results = max_results if max_results is not None else self.MAX_RESULTS
+
+    def get_timeout(self):
+        """Gets the (connect, read) timeout used for every request.
+
+        :returns: a tuple of the connect and read timeouts in seconds
+        """
+        return (self.connect_timeout, self.read_timeout)
+
+    def build_url(self, fields, **params):
+        """Builds a search URL that limits the docs returned and the keys in each doc.
+
+        :param fields: the doc keys to request
+        :param params: the search parameters, e.g. q or author
+        :returns: the search URL
+        """
+        params['fields'] = ','.join(fields)
+        params.setdefault('limit', self.max_results)
+        return "%s?%s" % (self.API_URL, urlencode(params))
+
+    def close(self):
+        """Closes the HTTP session and its pooled connections."""
+        self.session.close()
 
     def make_request(self, url):
-        """Makes a HTTP request to the given URL.
+        """Makes a HTTP request to the given URL, answering from the cache when possible.
+
+        Concurrent misses for the same normalized URL share a single request.
         
         :param url: the url used for the HTTP request
-        :returns: the JSON body of the request, None if non 200 status code or ConnectionError
+        :returns: the JSON body of the request, None if non 200 status code, ConnectionError or Timeout
+        """
+        key = normalize_url(url)
+        json_data = self.cache.get(key, _MISSING)
+        if json_data is not _MISSING:
+            return json_data
+        return self.in_flight.do(key, lambda: self._fetch_and_cache(key, url))
+
+    def _fetch_and_cache(self, key, url):
+        json_data = self.fetch(url)
+        self.cache.set(key, json_data)
+        return json_data
+
+    def fetch(self, url):
+        """Makes a HTTP request to the given URL without consulting the cache.
+
+        :param url: the url used for the HTTP request
+        :returns: the JSON body of the request, None if non 200 status code, ConnectionError or Timeout
         """
         try:
-            response = requests.get(url)
+            response = self.session.get(url, timeout=self.get_timeout())
             if response.status_code != 200:
                 return None
             return response.json()
-        except requests.ConnectionError:
+        except (requests.ConnectionError, requests.Timeout):
             return None
 
+    def stream_docs(self, url):
+        """Makes a HTTP request and yields the docs of the response as they arrive.
+
+        The body is parsed incrementally, so memory use does not grow with the
+        number of docs and the request is closed as soon as the caller stops.
+        Streamed responses bypass the cache.
+
+        :param url: the url used for the HTTP request
+        :returns: a generator of docs, empty if non 200 status code, ConnectionError or Timeout
+        """
+        try:
+            response = self.session.get(url, timeout=self.get_timeout(), stream=True)
+        except (requests.ConnectionError, requests.Timeout):
+            return
+        with response:
+            if response.status_code != 200:
+                return
+            chunks = response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)
+            try:
+                for doc in iter_array_items(chunks, 'docs'):
+                    yield doc
+            except (requests.ConnectionError, requests.Timeout):
+                return
+
+    def search_book(self, book):
+        """Searches for a given book once for all of the title accessors.
+        
+        :param book: the title of the book
+        :returns: the BookSearchResult for the title
+        """
+        request_url = self.build_url(self.BOOK_FIELDS, q=book)
+        return BookSearchResult.from_json(self.make_request(request_url))
+
     def is_book_available(self, book):
         """Determines if a given book is available to borrow.
         
         :param book: the title of the book
         :returns: True if available, False if not
         """
-        request_url = "%s?q=%s" % (self.API_URL, book)
-        json_data = self.make_request(request_url)
-        if json_data and len(json_data['docs']) >= 1:
-            return True
-        return False
+        return self.search_book(book).is_available()
 
     def books_by_author(self, author):
         """Gets all the books written by a given author.
@@ -42,7 +217,7 @@ class Books_API:
         :param author: the name of the author
         :returns: the titles of all the books in a list form
         """
-        request_url = "%s?author=%s" % (self.API_URL, author)
+        request_url = self.build_url(self.AUTHOR_FIELDS, author=author)
         json_data = self.make_request(request_url)
         if not json_data:
             return []
@@ -51,27 +226,59 @@ class Books_API:
             books.append(book['title_suggest'])
         return books
 
+    def stream_books_by_author(self, author):
+        """Yields the books written by a given author while the response is read.
+
+        :param author: the name of the author
+        :returns: a generator of book titles
+        """
+        request_url = self.build_url(self.AUTHOR_FIELDS, author=author)
+        for book in self.stream_docs(request_url):
+            yield book['title_suggest']
+
+    def iter_books_by_author(self, author, page_size=None, prefetch=False):
+        """Yields every book written by a given author, one result page at a time.
+
+        Pages are requested in order with offset and limit until numFound docs
+        have been seen. With prefetch, the next page is requested in the
+        background while the caller consumes the current one.
+
+        :param author: the name of the author
+        :param page_size: the number of docs per page, defaults to max_results
+        :param prefetch: True to fetch the next page ahead of time
+        :returns: a generator of book titles
+        """
+        page_size = page_size if page_size is not None else self.max_results
+
+        def fetch_page(offset):
+            return self.make_request(self.build_url(self.AUTHOR_FIELDS, author=author,
+                                                    limit=page_size, offset=offset))
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            offset = 0
+            page = fetch_page(offset)
+            while page and page['docs']:
+                offset += len(page['docs'])
+                next_page = None
+                if offset < page['numFound']:
+                    next_page = executor.submit(fetch_page, offset) if executor else offset
+                for book in page['docs']:
+                    yield book['title_suggest']
+                if next_page is None:
+                    return
+                page = next_page.result() if executor else fetch_page(next_page)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
     def get_book_info(self, book):
         """Gets the information for a given book.
         
         :param book: the title of the book
         :returns: a list of dictionaries with book data
         """
-        request_url = "%s?q=%s" % (self.API_URL, book)
-        json_data = self.make_request(request_url)
-        if not json_data:
-            return []
-        books_info = []
-        for book in json_data['docs']:
-            info = {'title': book['title']}
-            if 'publisher' in book:
-                info.update({'publisher': book['publisher']})
-            if 'publish_year' in book:
-                info.update({'publish_year': book['publish_year']})
-            if 'language' in book:
-                info.update({'language': book['language']})
-            books_info.append(info)
-        return books_info
+        return self.search_book(book).get_book_info()
 
     def get_ebooks(self, book):
         """Gets the ebooks for a given book.
@@ -79,12 +286,13 @@ class Books_API:
         :param book: the title of the book
         :returns: data about the ebooks
         """
-        request_url = "%s?q=%s" % (self.API_URL, book)
-        json_data = self.make_request(request_url)
-        if not json_data:
-            return []
-        ebooks = []
-        for book in json_data['docs']:
-            if book['ebook_count_i'] >= 1:
-                ebooks.append({'title': book['title'], 'ebook_count': book['ebook_count_i']})
-        return ebooks
+        return self.search_book(book).get_ebooks()
+
+    def stream_ebooks(self, book):
+        """Yields the ebooks for a given book while the response is read.
+
+        :param book: the title of the book
+        :returns: a generator of data about the ebooks
+        """
+        request_url = self.build_url(self.BOOK_FIELDS, q=book)
+        return iter_ebooks(self.stream_docs(request_url))
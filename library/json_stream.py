@@ -0,0 +1,118 @@
+"""
+Filename: json_stream.py
+Description: incremental parser yielding the items of a JSON array while the body is still being read
+"""
+
+import codecs
+import json
+import re
+
+_WHITESPACE = ' \t\n\r'
+_decoder = json.JSONDecoder()
+# what may follow a number up to the buffer's end if the number goes on in the next chunk
+_number_tail = re.compile(r'[0-9.eE+-]*\Z').match
+
+
+class _Reader:
+    """Buffers chunks of a JSON document, keeping only the unparsed tail in memory."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Appends the next non-empty chunk to the buffer.
+
+        :returns: True if more data was read, False at the end of the stream
+        """
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._text.decode(chunk)
+            if chunk:
+                self.buffer = self.buffer[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Skips whitespace and gets the next character.
+
+        :returns: the next character, or '' at the end of the stream
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        """Consumes the given structural character.
+
+        :param char: the character expected next
+        """
+        found = self.peek()
+        if found != char:
+            raise ValueError("Malformed JSON stream: expected %r, found %r" % (char, found))
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value, reading more data as needed.
+
+        :returns: the decoded value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a number cut at the buffer's end, e.g. after '1.' or '2e', continues in the next chunk
+            if (type(value) in (int, float) and not self.eof and _number_tail(self.buffer, end)
+                    and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_array_items(chunks, key):
+    """Yields the items of an array held under a key of the top-level JSON object.
+
+    Only one item is decoded at a time, and other top-level values are skipped.
+    Stopping early leaves the rest of the stream unread.
+
+    :param chunks: an iterable of bytes or str pieces of the JSON document
+    :param key: the top-level key of the array
+    :returns: a generator of the array's items
+    """
+    reader = _Reader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key:
+            reader.expect('[')
+            if reader.peek() == ']':
+                return
+            while True:
+                yield reader.value()
+                if reader.peek() == ',':
+                    reader.pos += 1
+                else:
+                    reader.expect(']')
+                    return
+        reader.value()
+        if reader.peek() == ',':
+            reader.pos += 1
+        else:
+            reader.expect('}')
+            return
@@ -3,42 +3,51 @@ Filename: library.py
 Description: Library class used for SWEN-352 mocking activity.
 """
 
-from library.patron import Patron
+from library.patron import Patron, InvalidNameException
 from library.library_db_interface import Library_DB
 from library.ext_api_interface import Books_API
+from concurrent.futures import ThreadPoolExecutor
 
 class Library:
     """Class used to represent a library."""
 
-    def __init__(self):
-        """Constructor for the Library class."""
-        self.db = Library_DB()
-        self.api = Books_API()
+    BATCH_WORKERS = 8
+
+    def __init__(self, db=None, api=None):
+        """Constructor for the Library class.
+
+        :param db: the Library_DB to use, defaults to one on the TinyDB file
+        :param api: the Books_API to use, a new one is created if None
+        """
+        self.db = db if db is not None else Library_DB()
+        self.api = api if api is not None else Books_API()
 
     ############################################################################
     ################################ API METHODS ###############################
     ############################################################################
 
-    def is_ebook(self, book):
+    def is_ebook(self, book, result=None):
         """Checks if the book is an e-book.
         
         :param book: the title of the book
+        :param result: an already fetched BookSearchResult for the title
         :returns: True if yes, False if not
         """
-        ebooks = self.api.get_ebooks(book)
+        ebooks = result.get_ebooks() if result is not None else self.api.get_ebooks(book)
         book = book.lower()
         for ebook in ebooks:
             if book == ebook['title'].lower():
                 return True
         return False
 
-    def get_ebooks_count(self, book):
+    def get_ebooks_count(self, book, result=None):
         """Gets the number of ebooks for a given book.
         
         :param book: the title of the book
+        :param result: an already fetched BookSearchResult for the title
         :returns: the number of ebooks
         """
-        ebooks = self.api.get_ebooks(book)
+        ebooks = result.get_ebooks() if result is not None else self.api.get_ebooks(book)
         ebook_count = 0
         for ebook in ebooks:
             ebook_count += ebook['ebook_count']
@@ -57,19 +66,71 @@ class Library:
                 return True
         return False
 
-    def get_languages_for_book(self, book):
+    def get_languages_for_book(self, book, result=None):
         """Get the available languages for a given book.
         
         :param book: the title of the book
+        :param result: an already fetched BookSearchResult for the title
         :returns: the set of languages the book is available in
         """
-        books_info = self.api.get_book_info(book)
+        books_info = result.get_book_info() if result is not None else self.api.get_book_info(book)
         lang_set = set()
         for book in books_info:
             if 'language' in book:
                 lang_set.update(book['language'])
         return lang_set
 
+    def run_batch(self, lookup, titles):
+        """Runs a per-title lookup for many titles on a thread pool.
+
+        Titles that only differ by case are looked up once.
+
+        :param lookup: function taking a title
+        :param titles: the titles of the books
+        :returns: a dict keyed by the original titles of the lookup results, a title
+            whose lookup raised maps to the exception instead
+        """
+        unique = {}
+        for title in titles:
+            unique.setdefault(title.lower(), title)
+        if not unique:
+            return {}
+
+        def run(title):
+            try:
+                return lookup(title)
+            except Exception as error:
+                return error
+
+        workers = min(self.BATCH_WORKERS, len(unique))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = dict(zip(unique, executor.map(run, unique.values())))
+        return {title: results[title.lower()] for title in titles}
+
+    def are_ebooks(self, titles):
+        """Checks if each of the books is an e-book.
+
+        :param titles: the titles of the books
+        :returns: a dict keyed by title of True/False, or the exception if the lookup failed
+        """
+        return self.run_batch(self.is_ebook, titles)
+
+    def get_ebooks_counts(self, titles):
+        """Gets the number of ebooks for each of the books.
+
+        :param titles: the titles of the books
+        :returns: a dict keyed by title of the ebook counts, or the exception if the lookup failed
+        """
+        return self.run_batch(self.get_ebooks_count, titles)
+
+    def get_languages_for_books(self, titles):
+        """Gets the available languages for each of the books.
+
+        :param titles: the titles of the books
+        :returns: a dict keyed by title of the language sets, or the exception if the lookup failed
+        """
+        return self.run_batch(self.get_languages_for_book, titles)
+
     ############################################################################
     ################################# DB METHODS ###############################
     ############################################################################
@@ -86,6 +147,27 @@ class Library:
         patron = Patron(fname, lname, age, memberID)
         return self.db.insert_patron(patron)
 
+    def register_patrons(self, rows):
+        """Registers many Patrons with the library in one database write.
+
+        Every row is validated before anything is written, so one bad name
+        leaves the database untouched.
+
+        :param rows: an iterable of (fname, lname, age, memberID) tuples
+        :returns: a dictionary with the 'inserted' and 'skipped' memberIDs
+        """
+        patrons = []
+        invalid = []
+        for fname, lname, age, memberID in rows:
+            try:
+                patrons.append(Patron(fname, lname, age, memberID))
+            except InvalidNameException:
+                invalid.append(memberID)
+        if invalid:
+            raise InvalidNameException("Name should not contain numbers (memberIDs: %s)"
+                                       % ', '.join(str(memberID) for memberID in invalid))
+        return self.db.insert_patrons(patrons)
+
     def is_patron_registered(self, patron):
         """Determines if the Patron is already registered in the database.
         
@@ -103,8 +185,12 @@ class Library:
         :param book: the title of the book
         :param patron: the Patron object
         """
-        patron.add_borrowed_book(book.lower())
-        self.db.update_patron(patron)
+        # the stored books are re-read under the Patron's lock so a concurrent
+        # checkout for the same Patron is not overwritten
+        with self.db.lock_patron(patron.get_memberID()):
+            self.db.refresh_patron(patron)
+            patron.add_borrowed_book(book.lower())
+            self.db.update_patron(patron)
 
     def return_borrowed_book(self, book, patron):
         """Returns a borrowed book for a Patron.
@@ -112,8 +198,26 @@ class Library:
         :param book: the title of the book
         :param patron: the Patron object
         """
-        patron.return_borrowed_book(book.lower())
-        self.db.update_patron(patron)
+        with self.db.lock_patron(patron.get_memberID()):
+            self.db.refresh_patron(patron)
+            patron.return_borrowed_book(book.lower())
+            self.db.update_patron(patron)
+
+    def get_borrowers(self, book):
+        """Gets the Patrons who currently have a book.
+
+        :param book: the title of the book
+        :returns: the set of memberIDs of the Patrons who borrowed it
+        """
+        return self.db.get_borrowers(book)
+
+    def count_copies_out(self, book):
+        """Gets the number of copies of a book currently borrowed.
+
+        :param book: the title of the book
+        :returns: the number of copies out
+        """
+        return self.db.count_borrowers(book)
 
     def is_book_borrowed(self, book, patron):
         """Determines if the Patron has borrowed a given book.
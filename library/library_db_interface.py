@@ -3,18 +3,70 @@ Filename: library_db_interface.py
 Description: module used for interacting with the local database
 """
 
+from contextlib import contextmanager
+
+from library.locks import StripedLock
 from library.patron import Patron
-from tinydb import TinyDB, Query
-import os
+from library.patron_store import TinyDBPatronStore
+from library.snapshot_store import write_snapshot
 
 class Library_DB:
-    """Class for the local library database."""
+    """Class for the local library database.
+
+    A Library_DB may be shared by several threads. The store guards its own
+    data, and read-modify-write sequences on one Patron hold that Patron's
+    lock from lock_patron, so changes to different Patrons never wait on
+    each other.
+    """
 
     DATABASE_FILE = 'db.json'
+    # a name from library.serializers, None for orjson when installed and json otherwise
+    SERIALIZER = None
+    LOCK_STRIPES = 64
+
+    def __init__(self, store=None):
+        """Constructor for the Library_DB object.
+
+        :param store: the PatronStore holding the records, defaults to a TinyDB file at DATABASE_FILE written with SERIALIZER
+        """
+        if store is None:
+            store = TinyDBPatronStore(self.DATABASE_FILE, serializer=self.SERIALIZER)
+        self.store = store
+        self.patron_locks = StripedLock(self.LOCK_STRIPES)
+
+    @contextmanager
+    def lock_patron(self, memberID):
+        """Serializes changes to one Patron for the duration of a with block.
 
-    def __init__(self):
-        """Constructor for the Library_DB object."""
-        self.db = TinyDB(self.DATABASE_FILE)
+        The block holds the Patron's stripe lock, and for a store shared with
+        other processes it also keeps those processes from writing.
+
+        :param memberID: the ID of the Patron
+        :returns: a reentrant context manager
+        """
+        with self.patron_locks.for_key(memberID), self.store.exclusive(memberID):
+            yield
+
+    def refresh_patron(self, patron):
+        """Brings a Patron's borrowed books up to date with the database.
+
+        Another thread may have borrowed or returned books for the same Patron
+        since this object was read, so call it holding lock_patron before
+        changing the Patron and writing it back.
+
+        :param patron: the Patron object
+        :returns: True if the Patron is in the database
+        """
+        record = self.store.get(patron.get_memberID())
+        if record is None:
+            return False
+        stored = set(record['borrowed_books'])
+        for book in list(patron.get_borrowed_books()):
+            if book not in stored:
+                patron.return_borrowed_book(book)
+        for book in record['borrowed_books']:
+            patron.add_borrowed_book(book)
+        return True
 
     def insert_patron(self, patron):
         """Inserts a Patron into the database.
@@ -24,28 +76,72 @@ class Library_DB:
         """
         if not patron:
             return None
-        if self.retrieve_patron(patron.get_memberID()): # patron already in db
-            return None
-        data = self.convert_patron_to_db_format(patron)
-        id = self.db.insert(data)
+        with self.lock_patron(patron.get_memberID()):
+            if self.store.contains(patron.get_memberID()): # patron already in db
+                return None
+            data = self.convert_patron_to_db_format(patron)
+            id = self.store.insert(data)
         return id
 
+    def insert_patrons(self, patrons):
+        """Inserts many Patrons into the database with a single write.
+
+        A Patron is skipped if their memberID is already in the database or
+        appears earlier in the list.
+
+        :param patrons: a list of Patron objects
+        :returns: a dictionary with the 'inserted' and 'skipped' memberIDs
+        """
+        seen = set()
+        records = []
+        skipped = []
+        # every stripe is held so no single insert can slip in between the checks and the write
+        with self.patron_locks.all(), self.store.exclusive():
+            for patron in patrons:
+                if not patron:
+                    continue
+                memberID = patron.get_memberID()
+                if memberID in seen or self.store.contains(memberID):
+                    skipped.append(memberID)
+                    continue
+                seen.add(memberID)
+                records.append(self.convert_patron_to_db_format(patron))
+            if records:
+                self.store.insert_many(records)
+        return {'inserted': [record['memberID'] for record in records], 'skipped': skipped}
+
     def get_patron_count(self):
         """Gets the number of Patrons in the database.
         
         :returns: the total number of Patrons in the DB
         """
-        results = self.db.all()
-        return len(results)
+        return self.store.count()
 
     def get_all_patrons(self):
         """Gets a list of all the Patrons in the database.
         
         :returns: a list of all the Patrons
         """
-        results = self.db.all()
+        results = self.store.all()
         return results
 
+    def iter_patron_records(self, batch_size=1000):
+        """Yields the data of every Patron in the database one at a time.
+
+        :param batch_size: the number of records read from storage at a time
+        :returns: a generator of Patron dictionaries, as in get_all_patrons
+        """
+        return self.store.iter_records(batch_size)
+
+    def iter_patrons(self, batch_size=1000):
+        """Yields every Patron in the database one at a time.
+
+        :param batch_size: the number of records read from storage at a time
+        :returns: a generator of Patron objects
+        """
+        for record in self.store.iter_records(batch_size):
+            yield self.convert_db_format_to_patron(record)
+
     def update_patron(self, patron):
         """Updates a Patron's data in the DB.
         
@@ -54,9 +150,8 @@ class Library_DB:
         """
         if not patron:
             return None
-        query = Query()
         data = self.convert_patron_to_db_format(patron)
-        self.db.update(data, query.memberID == patron.get_memberID())
+        self.store.update(patron.get_memberID(), data)
 
     def retrieve_patron(self, memberID):
         """Gets a Patron from the database.
@@ -64,17 +159,65 @@ class Library_DB:
         :param memberID: the ID for the Patron to retrieve
         :returns: the Patron with the given ID, or None
         """
-        query = Query()
-        # assuming no two people in the db have the same memberID
-        results = self.db.search(query.memberID == memberID)
-        if results:
-            return Patron(results[0]['fname'], results[0]['lname'], results[0]['age'],
-            results[0]['memberID'])
+        result = self.store.get(memberID)
+        if result:
+            return self.convert_db_format_to_patron(result)
         return None
 
+    def get_borrowers(self, book):
+        """Gets the Patrons who currently have a book.
+
+        :param book: the title of the book
+        :returns: a set of the memberIDs of the Patrons who borrowed it
+        """
+        return self.store.get_borrowers(book.lower())
+
+    def count_borrowers(self, book):
+        """Gets the number of Patrons who currently have a book.
+
+        :param book: the title of the book
+        :returns: the number of Patrons who borrowed it
+        """
+        return self.store.count_borrowers(book.lower())
+
+    def delete_patron(self, memberID):
+        """Deletes a Patron from the database.
+
+        :param memberID: the ID for the Patron to delete
+        :returns: True if the Patron was deleted, False if they were not in the DB
+        """
+        with self.lock_patron(memberID):
+            return self.store.delete(memberID)
+
+    def export_snapshot(self, path):
+        """Writes every Patron to a read-only binary snapshot.
+
+        Open it with Library_DB(store=SnapshotPatronStore(path)) for fast,
+        memory-mapped lookups in processes that never write.
+
+        :param path: the path of the snapshot file
+        :returns: the number of Patrons written
+        """
+        return write_snapshot(self.store.iter_records(), path)
+
+    @contextmanager
+    def batch(self):
+        """Groups the writes made inside a with block into one commit.
+
+        For example: with library.db.batch(): followed by many borrow_book calls.
+        The block holds every Patron's stripe lock, taken before the store's
+        locks as lock_patron does, so other threads wait for the batch to end.
+        """
+        with self.patron_locks.all(), self.store.batch():
+            yield self
+
+    def flush(self):
+        """Commits any buffered writes to disk."""
+        self.store.flush()
+
     def close_db(self):
-        """Closes the database."""
-        self.db.close()
+        """Closes the database, committing any buffered writes first."""
+        self.store.close()
 
     def convert_patron_to_db_format(self, patron):
         """Converts the Patron object to a dictionary format.
@@ -83,4 +226,12 @@ class Library_DB:
         :returns: a dictionary of the Patron's data
         """
         return {'fname': patron.get_fname(), 'lname': patron.get_lname(), 'age': patron.get_age(), 'memberID': patron.get_memberID(),
-        'borrowed_books': patron.get_borrowed_books()}
+        'borrowed_books': list(patron.get_borrowed_books())}
+
+    def convert_db_format_to_patron(self, data):
+        """Converts a dictionary of a Patron's data to a Patron object.
+
+        :param data: the dictionary of the Patron's data
+        :returns: the Patron python object
+        """
+        return Patron.from_db(data)
@@ -0,0 +1,226 @@
+"""
+Filename: locks.py
+Description: locks shared by the threads serving one library database
+"""
+
+from contextlib import contextmanager
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError: # not available on Windows
+    fcntl = None
+
+class ReadWriteLock:
+    """Lock held either by any number of readers or by a single writer.
+
+    Writers are preferred: once a writer is waiting, new readers queue behind
+    it so a steady stream of lookups cannot starve a checkout. Both sides are
+    reentrant, and the thread holding the write side may also take the read
+    side, so a write that triggers a flush does not deadlock on itself.
+    """
+
+    def __init__(self):
+        """Constructor for the ReadWriteLock class."""
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    def acquire_read(self):
+        """Takes the read side, waiting while a writer holds or wants the lock."""
+        depth = getattr(self._local, 'read_depth', 0)
+        if depth:
+            self._local.read_depth = depth + 1
+            return
+        # the writer reads what it is writing without being counted as a reader
+        counted = self._writer != threading.get_ident()
+        if counted:
+            with self._cond:
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+                self._readers += 1
+        self._local.read_depth = 1
+        self._local.counted = counted
+
+    def release_read(self):
+        """Gives back the read side."""
+        depth = self._local.read_depth - 1
+        self._local.read_depth = depth
+        if depth or not self._local.counted:
+            return
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        """Takes the write side, waiting until no other thread holds either side."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if getattr(self._local, 'read_depth', 0):
+                raise RuntimeError('cannot upgrade a read lock to a write lock')
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        """Gives back the write side."""
+        with self._cond:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read_lock(self):
+        """Holds the read side for the duration of the block."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_lock(self):
+        """Holds the write side for the duration of the block."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class StripedLock:
+    """Fixed pool of reentrant locks handed out by the hash of a key.
+
+    Keys that hash to different stripes never wait on each other, and memory
+    stays bounded however many keys there are.
+    """
+
+    STRIPES = 64
+
+    def __init__(self, stripes=None):
+        """Constructor for the StripedLock class.
+
+        :param stripes: the number of locks in the pool
+        """
+        stripes = stripes if stripes is not None else self.STRIPES
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def __len__(self):
+        return len(self._locks)
+
+    def for_key(self, key):
+        """Gets the lock guarding a key.
+
+        :param key: any hashable key
+        :returns: the lock of the key's stripe
+        """
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def all(self):
+        """Holds every stripe for the duration of the block.
+
+        The stripes are taken in a fixed order, so two threads doing this
+        cannot deadlock each other.
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+
+class ProcessLock:
+    """Advisory fcntl lock on a file shared by the processes using one database.
+
+    The lock file also holds a generation counter that writers bump after
+    each commit, so other processes can tell that the database changed
+    without reading it. The lock is reentrant, but it belongs to the open
+    file, so every thread of a process shares it: callers keep their own
+    threads apart before taking it.
+    """
+
+    def __init__(self, path):
+        """Constructor for the ProcessLock class.
+
+        :param path: the path of the lock file, created if missing
+        """
+        if fcntl is None:
+            raise OSError('process locking needs fcntl, which this platform lacks')
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        self._depth = 0
+
+    def generation(self):
+        """Gets the number of commits recorded in the lock file.
+
+        :returns: the generation counter
+        """
+        data = os.pread(self._fd, 8, 0)
+        return int.from_bytes(data, 'little') if len(data) == 8 else 0
+
+    def held(self):
+        """Checks whether this process holds the exclusive lock.
+
+        :returns: True inside an exclusive block
+        """
+        return self._depth > 0
+
+    def bump(self):
+        """Records a commit. Call it holding the exclusive lock.
+
+        :returns: the new generation counter
+        """
+        generation = self.generation() + 1
+        os.pwrite(self._fd, generation.to_bytes(8, 'little'), 0)
+        return generation
+
+    @contextmanager
+    def exclusive(self):
+        """Holds the lock against every other process for the block.
+
+        :returns: a context manager yielding True for the outermost block
+        """
+        outermost = not self._depth
+        if outermost:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._depth += 1
+        try:
+            yield outermost
+        finally:
+            self._depth -= 1
+            if outermost:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def shared(self):
+        """Holds the lock against writing processes for the block."""
+        if self._depth:
+            yield
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        """Closes the lock file."""
+        os.close(self._fd)
+
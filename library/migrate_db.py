@@ -0,0 +1,48 @@
+"""
+Filename: migrate_db.py
+Description: imports the patrons of a TinyDB db.json file into a SQLite database
+
+Usage: python -m library.migrate_db [db.json] [library.sqlite3]
+"""
+
+import sys
+
+from library.patron_store import TinyDBPatronStore
+from library.sqlite_patron_store import SQLitePatronStore
+
+def migrate(json_path, sqlite_path):
+    """Copies every patron record from a TinyDB file into a SQLite database.
+
+    Patrons whose memberID is already in the SQLite database are left as they are.
+
+    :param json_path: the path of the TinyDB JSON file
+    :param sqlite_path: the path of the SQLite database, created if missing
+    :returns: a tuple of the number of patrons imported and skipped
+    """
+    source = TinyDBPatronStore(json_path)
+    target = SQLitePatronStore(sqlite_path)
+    try:
+        records = []
+        seen = set()
+        skipped = 0
+        for record in source.all():
+            if record['memberID'] in seen or target.contains(record['memberID']):
+                skipped += 1
+                continue
+            seen.add(record['memberID'])
+            records.append(dict(record))
+        target.insert_many(records)
+        return len(records), skipped
+    finally:
+        source.close()
+        target.close()
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    json_path = args[0] if len(args) > 0 else 'db.json'
+    sqlite_path = args[1] if len(args) > 1 else 'library.sqlite3'
+    imported, skipped = migrate(json_path, sqlite_path)
+    print("Imported %d patrons from %s into %s (%d skipped)" % (imported, json_path, sqlite_path, skipped))
+
+if __name__ == '__main__':
+    main()
@@ -4,14 +4,80 @@ Description: Patron class for SWEN-352 mocking activity.
 """
 
 import re
+from collections.abc import Sequence
+
+_has_digit = re.compile(r'\d').search
 
 class InvalidNameException(Exception):
     """Custom Exception for an invalid name."""
     pass
 
+class BorrowedBooks(Sequence):
+    """Insertion-ordered set of the titles a Patron has borrowed.
+
+    Titles are the keys of a dict, so membership, adding and removing are O(1)
+    while iteration keeps borrowing order. It compares equal to a list with the
+    same titles in the same order.
+    """
+
+    __slots__ = ('_books',)
+
+    def __init__(self, books=()):
+        """Constructor for the BorrowedBooks class.
+
+        :param books: the titles already borrowed
+        """
+        self._books = dict.fromkeys(books)
+
+    def add(self, book):
+        """Adds a title, keeping its original position if already present.
+
+        :param book: the title of the book
+        """
+        self._books[book] = None
+
+    def discard(self, book):
+        """Removes a title if present.
+
+        :param book: the title of the book
+        """
+        self._books.pop(book, None)
+
+    def __contains__(self, book):
+        return book in self._books
+
+    def __iter__(self):
+        return iter(self._books)
+
+    def __len__(self):
+        return len(self._books)
+
+    def __getitem__(self, index):
+        return list(self._books)[index]
+
+    def __eq__(self, other):
+        if isinstance(other, BorrowedBooks):
+            return list(self._books) == list(other._books)
+        if isinstance(other, list):
+            return list(self._books) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'BorrowedBooks(%r)' % list(self._books)
+
 class Patron:
     """Patron class used to represent a user for a library."""
 
+    __slots__ = ('fname', 'lname', 'age', 'memberID', 'borrowed_books')
+
     def  __init__(self, fname, lname, age, memberID):
         """Constructor for the Patron class.
 
@@ -21,28 +87,43 @@ class Patron:
         :param memberID: the ID for the Patron in the library's system
         """
 
-        if re.search('\d', fname) or re.search('\d', lname):
+        if _has_digit(fname) or _has_digit(lname):
             raise InvalidNameException("Name should not contain numbers")
         self.fname = fname
         self.lname = lname
         self.age = age
         self.memberID = memberID
-        self.borrowed_books = []
+        self.borrowed_books = BorrowedBooks()
+
+    @classmethod
+    def from_db(cls, record):
+        """Builds a Patron from a database record without validating it again.
+
+        Records only reach the database through the constructor, so their names
+        have already been checked. The borrowed books are restored as stored.
+
+        :param record: the dictionary of the Patron's data
+        :returns: the Patron python object
+        """
+        patron = cls.__new__(cls)
+        patron.fname = record['fname']
+        patron.lname = record['lname']
+        patron.age = record['age']
+        patron.memberID = record['memberID']
+        patron.borrowed_books = BorrowedBooks(record.get('borrowed_books', ()))
+        return patron
 
     def add_borrowed_book(self, book):
         """Adds a book to the list of borrowed books for the Patron
         
         :param book: the title of the book
         """
-        book = book.lower()
-        if book in self.borrowed_books:
-            return
-        self.borrowed_books.append(book)
+        self.borrowed_books.add(book.lower())
 
     def get_borrowed_books(self):
-        """Gets the list of borrowed books for the Patron.
+        """Gets the borrowed books for the Patron.
         
-        :returns: the list of borrowed books
+        :returns: the borrowed books, in the order they were borrowed
         """
         return self.borrowed_books
 
@@ -51,17 +132,32 @@ class Patron:
         
         :param book: the title of the book to remove
         """
-        book = book.lower()
-        if book in self.borrowed_books:
-            self.borrowed_books.remove(book)
+        self.borrowed_books.discard(book.lower())
 
     def  __eq__(self, other):
-        """Equals function for the Patron class."""
-        return self.__dict__ == other.__dict__
+        """Equals function for the Patron class.
+
+        The memberID is compared first since it differs between almost any
+        two distinct patrons.
+        """
+        if not isinstance(other, Patron):
+            return NotImplemented
+        return (self.memberID == other.memberID
+                and self.fname == other.fname
+                and self.lname == other.lname
+                and self.age == other.age
+                and self.borrowed_books == other.borrowed_books)
 
     def __ne__(self, other):
         """Not-equal function for the Patron class."""
-        return not self.__eq__(other)
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        """Hash function for the Patron class, based on the memberID."""
+        return hash(self.memberID)
 
     def get_fname(self):
         """Getter for the first name of the Patron.
@@ -0,0 +1,135 @@
+"""
+Filename: patron_frame.py
+Description: column-oriented, read-only view of the patron roster for reporting
+"""
+
+try:
+    import numpy as np
+except ImportError: # numpy is only needed for reporting
+    np = None
+
+
+class PatronFrame:
+    """Patron data held as NumPy columns for vectorized reports.
+
+    Row i is one patron. member_ids and ages are arrays of length n, and the
+    borrowed titles of row i are titles[offsets[i]:offsets[i + 1]], so the
+    borrow counts are the differences of offsets. A frame is a snapshot and
+    does not follow later changes to the database.
+
+    A stored age that is not a whole number is held as AGE_UNKNOWN, and
+    those rows are left out of the age reports.
+    """
+
+    AGE_UNKNOWN = -1
+
+    def __init__(self, member_ids, ages, offsets, titles):
+        """Constructor for the PatronFrame class.
+
+        :param member_ids: the memberIDs, one per row
+        :param ages: the ages, one per row
+        :param offsets: the n + 1 boundaries of each row's titles
+        :param titles: every borrowed title, row after row
+        """
+        if np is None:
+            raise ImportError('PatronFrame requires numpy')
+        self.member_ids = np.asarray(member_ids, dtype=object)
+        self.ages = np.asarray(ages, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.titles = np.asarray(titles, dtype=object)
+        if len(self.offsets) != len(self.member_ids) + 1 or len(self.ages) != len(self.member_ids):
+            raise ValueError('columns must describe the same number of patrons')
+
+    @classmethod
+    def from_db(cls, db, batch_size=1000):
+        """Builds a frame from every Patron in a Library_DB.
+
+        :param db: the Library_DB to read
+        :param batch_size: the number of records read from storage at a time
+        :returns: the PatronFrame
+        """
+        member_ids = []
+        ages = []
+        offsets = [0]
+        titles = []
+        for record in db.iter_patron_records(batch_size):
+            member_ids.append(record['memberID'])
+            try:
+                ages.append(int(record['age']))
+            except (TypeError, ValueError, OverflowError):
+                ages.append(cls.AGE_UNKNOWN)
+            titles.extend(record['borrowed_books'])
+            offsets.append(len(titles))
+        return cls(member_ids, ages, offsets, titles)
+
+    def __len__(self):
+        return len(self.member_ids)
+
+    def borrow_counts(self):
+        """Gets the number of books each patron has borrowed.
+
+        :returns: an array with one count per row
+        """
+        return np.diff(self.offsets)
+
+    def get_borrowed_books(self, row):
+        """Gets the titles borrowed by the patron in a row.
+
+        :param row: the row index
+        :returns: a list of titles
+        """
+        return self.titles[self.offsets[row]:self.offsets[row + 1]].tolist()
+
+    def filter(self, mask):
+        """Keeps the rows selected by a boolean mask.
+
+        :param mask: a boolean array with one entry per row
+        :returns: a new PatronFrame holding the selected rows
+        """
+        rows = np.flatnonzero(mask)
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # position of every kept title in the old titles column
+        taken = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return PatronFrame(self.member_ids[rows], self.ages[rows], offsets, self.titles[taken])
+
+    def age_between(self, low, high):
+        """Builds a mask of the patrons whose age is in a range.
+
+        :param low: the lowest age, inclusive
+        :param high: the highest age, exclusive
+        :returns: a boolean array with one entry per row
+        """
+        return self.has_age() & (self.ages >= low) & (self.ages < high)
+
+    def has_age(self):
+        """Builds a mask of the patrons whose age is known.
+
+        :returns: a boolean array with one entry per row
+        """
+        return self.ages != self.AGE_UNKNOWN
+
+    def age_histogram(self, bins=10):
+        """Counts the patrons in each age bin.
+
+        :param bins: the number of equal-width bins, or a sequence of bin edges
+        :returns: a tuple of the counts and the bin edges, as numpy.histogram
+        """
+        return np.histogram(self.ages[self.has_age()], bins=bins)
+
+    def borrow_count_distribution(self):
+        """Counts the patrons by how many books they have borrowed.
+
+        :returns: an array where entry k is the number of patrons with k books
+        """
+        return np.bincount(self.borrow_counts(), minlength=1)
+
+    def patrons_with_more_than(self, count):
+        """Gets the patrons who have borrowed more than a number of books.
+
+        :param count: the number of books
+        :returns: an array of memberIDs
+        """
+        return self.member_ids[self.borrow_counts() > count]
@@ -0,0 +1,412 @@
+"""
+Filename: patron_store.py
+Description: storage backends holding the patron records behind Library_DB
+"""
+
+from contextlib import contextmanager
+import os
+
+from tinydb import TinyDB
+from tinydb.storages import JSONStorage
+
+from library.locks import ProcessLock
+from library.tinydb_storages import CachedStorageProxy, GroupCommitMiddleware, SerializedStorage
+
+def copy_record(doc):
+    """Copies a stored document so the caller can change it freely.
+
+    :param doc: the stored patron document
+    :returns: a new dictionary with its own borrowed_books list
+    """
+    record = dict(doc)
+    record['borrowed_books'] = list(record.get('borrowed_books', []))
+    return record
+
+
+class PatronStore:
+    """Interface for the storage of patron records.
+
+    A record is a dictionary with the fname, lname, age, memberID and
+    borrowed_books of a Patron, as built by Library_DB.convert_patron_to_db_format.
+    """
+
+    def get(self, memberID):
+        """Gets the record of a patron.
+
+        :param memberID: the ID of the patron
+        :returns: the record, or None if there is no such patron
+        """
+        raise NotImplementedError
+
+    def contains(self, memberID):
+        """Determines if a patron is stored.
+
+        :param memberID: the ID of the patron
+        :returns: True if stored, False if not
+        """
+        return self.get(memberID) is not None
+
+    def insert(self, record):
+        """Stores the record of a new patron.
+
+        :param record: the patron record
+        :returns: the storage ID of the new record
+        """
+        raise NotImplementedError
+
+    def insert_many(self, records):
+        """Stores the records of several new patrons in one write.
+
+        :param records: a list of patron records with distinct memberIDs
+        :returns: the storage IDs of the new records
+        """
+        return [self.insert(record) for record in records]
+
+    def update(self, memberID, record):
+        """Replaces the record of a stored patron.
+
+        :param memberID: the ID of the patron
+        :param record: the new patron record
+        :returns: True if the patron was updated, False if they are not stored
+        """
+        raise NotImplementedError
+
+    def delete(self, memberID):
+        """Deletes the record of a patron.
+
+        :param memberID: the ID of the patron
+        :returns: True if the patron was deleted, False if they were not stored
+        """
+        raise NotImplementedError
+
+    def count(self):
+        """Gets the number of stored patrons.
+
+        :returns: the number of records
+        """
+        raise NotImplementedError
+
+    def all(self):
+        """Gets every stored record.
+
+        :returns: a list of the patron records
+        """
+        raise NotImplementedError
+
+    def get_borrowers(self, title):
+        """Gets the patrons who currently have a book.
+
+        :param title: the lowercased title of the book
+        :returns: a set of the memberIDs of the patrons who borrowed it
+        """
+        return set(record['memberID'] for record in self.iter_records()
+                   if title in record['borrowed_books'])
+
+    def count_borrowers(self, title):
+        """Gets the number of patrons who currently have a book.
+
+        :param title: the lowercased title of the book
+        :returns: the number of patrons who borrowed it
+        """
+        return len(self.get_borrowers(title))
+
+    def iter_records(self, batch_size=1000):
+        """Yields every stored record without building a list of them all.
+
+        :param batch_size: the number of records read from storage at a time
+        :returns: a generator of patron records
+        """
+        for record in self.all():
+            yield record
+
+    @contextmanager
+    def batch(self):
+        """Groups the writes made inside the block into one commit."""
+        yield self
+
+    @contextmanager
+    def exclusive(self, memberID=None):
+        """Keeps other processes from writing for the duration of the block.
+
+        A read followed by a write inside the block cannot lose a change made
+        by another process in between. Stores not shared between processes
+        need nothing here.
+
+        :param memberID: the patron the block works on, None for the whole store
+        """
+        yield self
+
+    def flush(self):
+        """Commits any buffered writes."""
+        pass
+
+    def close(self):
+        """Closes the storage, committing any buffered writes."""
+        pass
+
+
+class TinyDBPatronStore(PatronStore):
+    """Patron records kept in a TinyDB JSON file.
+
+    An in-memory memberID to document ID index, built when the file is opened,
+    lets point operations address documents by ID instead of running a query
+    over the whole table. A second index maps each borrowed title to the
+    memberIDs holding it. Writes go through a GroupCommitMiddleware, which by
+    default commits every write; raising write_cache_size or setting
+    flush_interval turns on group commit.
+
+    With multiprocess=True several processes can share the file. Writes hold
+    an fcntl lock on path + '.lock' and bump a generation counter kept in
+    it. Before each operation the store compares that counter and the
+    file's mtime and size with what it last saw, and only rereads the file
+    and rebuilds its indexes when they differ. Every write is committed
+    before the lock is released, so group commit is not available in this
+    mode.
+    """
+
+    def __init__(self, path, write_cache_size=None, flush_interval=None, storage=SerializedStorage,
+                 multiprocess=False, **kwargs):
+        """Constructor for the TinyDBPatronStore class.
+
+        :param path: the path of the database file
+        :param write_cache_size: the number of writes buffered before they are committed
+        :param flush_interval: the maximum seconds a write stays buffered, None for no limit
+        :param storage: the TinyDB storage class the writes are committed to
+        :param multiprocess: True if other processes use the same file at the same time
+        :param kwargs: extra arguments for the storage, e.g. serializer='msgpack' for SerializedStorage
+        """
+        if multiprocess and (write_cache_size is not None or flush_interval is not None
+                             or not issubclass(storage, JSONStorage)):
+            raise ValueError('multiprocess mode needs a write-through JSONStorage')
+        self.path = path
+        self.process_lock = ProcessLock(path + '.lock') if multiprocess else None
+        self._seen = None
+        self._wrote = False
+        self.middleware = GroupCommitMiddleware(storage, write_cache_size, flush_interval)
+        # TinyDB changes documents in place, so readers share the lock's read
+        # side with flushes and every change holds its write side
+        self.lock = self.middleware.lock
+        self._member_index = {}
+        self._borrowers = {}
+        with self.lock.write_lock(), self._process_exclusive():
+            self.db = TinyDB(path, storage=self.middleware, storage_proxy_class=CachedStorageProxy, **kwargs)
+            # storages that log individual documents are told which ones each operation changed
+            self._mark_dirty = getattr(self.middleware.storage, 'mark_dirty', None)
+            self._describing = getattr(self.middleware.storage, 'describing', None)
+            self.build_index()
+
+    def build_index(self):
+        """Builds the memberID to document ID and title to borrowers indexes from the database."""
+        with self.lock.write_lock():
+            member_index = {}
+            borrowers = {}
+            for doc in self.db.all():
+                member_index[doc['memberID']] = doc.doc_id
+                for title in doc.get('borrowed_books', []):
+                    borrowers.setdefault(title, set()).add(doc['memberID'])
+            # count() and contains() read the index without the lock, so it
+            # is swapped in complete rather than refilled in place
+            self._member_index = member_index
+            self._borrowers = borrowers
+
+    def _add_borrower(self, memberID, titles):
+        for title in titles:
+            self._borrowers.setdefault(title, set()).add(memberID)
+
+    def _remove_borrower(self, memberID, titles):
+        for title in titles:
+            borrowers = self._borrowers.get(title)
+            if borrowers is not None:
+                borrowers.discard(memberID)
+                if not borrowers:
+                    del self._borrowers[title]
+
+    def _changed(self, doc_ids):
+        if doc_ids:
+            self._wrote = True
+        if self._mark_dirty is not None:
+            self._mark_dirty(self.db.DEFAULT_TABLE, doc_ids)
+
+    def _stamp(self):
+        """Gets what identifies the version of the file other processes may have written."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return (self.process_lock.generation(), None, None)
+        return (self.process_lock.generation(), stat.st_mtime_ns, stat.st_size)
+
+    def _reload_if_changed(self):
+        """Rereads the file and rebuilds the indexes if another process wrote it."""
+        # while this process holds the lock nobody else can have written
+        if self.process_lock is None or self.process_lock.held() or self._stamp() == self._seen:
+            return
+        with self.lock.write_lock(), self.process_lock.shared():
+            self._reload()
+
+    def _reload(self):
+        stamp = self._stamp()
+        if stamp == self._seen:
+            return
+        self._discard_cache()
+        self._seen = stamp
+
+    def _discard_cache(self):
+        """Drops the decoded table and rebuilds the indexes from the storage."""
+        self.middleware.cache = None
+        self.middleware._cache_modified_count = 0
+        table = self.db.table(self.db.DEFAULT_TABLE)
+        table._storage._table = None
+        table.clear_cache()
+        # TinyDB only works out the next document ID when a table is opened
+        table._init_last_id(table._read())
+        self.build_index()
+
+    @contextmanager
+    def _process_exclusive(self):
+        """Holds the process lock, in sync with the file, for the block."""
+        if self.process_lock is None:
+            yield
+            return
+        with self.process_lock.exclusive() as outermost:
+            if outermost and self._seen is not None:
+                self._reload()
+            try:
+                yield
+            finally:
+                if outermost:
+                    if self._wrote:
+                        self.middleware.flush()
+                        self.process_lock.bump()
+                        self._wrote = False
+                    self._seen = self._stamp()
+
+    @contextmanager
+    def _reading(self):
+        self._reload_if_changed()
+        with self.lock.read_lock():
+            yield
+
+    @contextmanager
+    def _writing(self):
+        with self.lock.write_lock(), self._process_exclusive():
+            try:
+                if self._describing is None:
+                    yield
+                else:
+                    with self._describing():
+                        yield
+            except BaseException:
+                # TinyDB changes the cached table before writing it, so a
+                # failed write would leave a change the indexes do not know of
+                self._discard_cache()
+                self._wrote = False
+                raise
+
+    @contextmanager
+    def exclusive(self, memberID=None):
+        if self.process_lock is None:
+            yield self
+            return
+        with self._writing():
+            yield self
+
+    def get(self, memberID):
+        with self._reading():
+            doc_id = self._member_index.get(memberID)
+            if doc_id is None:
+                return None
+            # callers get copies and never hold the documents cached by the proxy
+            return copy_record(self.db.get(doc_id=doc_id))
+
+    def contains(self, memberID):
+        self._reload_if_changed()
+        return memberID in self._member_index
+
+    def insert(self, record):
+        with self._writing():
+            doc_id = self.db.insert(record)
+            self._member_index[record['memberID']] = doc_id
+            self._add_borrower(record['memberID'], record['borrowed_books'])
+            self._changed([doc_id])
+            return doc_id
+
+    def insert_many(self, records):
+        with self._writing():
+            doc_ids = self.db.insert_multiple(records)
+            for record, doc_id in zip(records, doc_ids):
+                self._member_index[record['memberID']] = doc_id
+                self._add_borrower(record['memberID'], record['borrowed_books'])
+            self._changed(doc_ids)
+            return doc_ids
+
+    def update(self, memberID, record):
+        with self._writing():
+            doc_id = self._member_index.get(memberID)
+            if doc_id is None:
+                return False
+            old_titles = set(self.db.get(doc_id=doc_id).get('borrowed_books', []))
+            new_titles = set(record['borrowed_books'])
+            self.db.update(record, doc_ids=[doc_id])
+            self._remove_borrower(memberID, old_titles - new_titles)
+            self._add_borrower(memberID, new_titles - old_titles)
+            self._changed([doc_id])
+            return True
+
+    def delete(self, memberID):
+        with self._writing():
+            doc_id = self._member_index.pop(memberID, None)
+            if doc_id is None:
+                return False
+            self._remove_borrower(memberID, self.db.get(doc_id=doc_id).get('borrowed_books', []))
+            self.db.remove(doc_ids=[doc_id])
+            self._changed([doc_id])
+            return True
+
+    def count(self):
+        # every stored patron has exactly one index entry
+        self._reload_if_changed()
+        return len(self._member_index)
+
+    def all(self):
+        with self._reading():
+            return [copy_record(doc) for doc in self.db.all()]
+
+    def get_borrowers(self, title):
+        with self._reading():
+            return set(self._borrowers.get(title, ()))
+
+    def count_borrowers(self, title):
+        with self._reading():
+            return len(self._borrowers.get(title, ()))
+
+    def iter_records(self, batch_size=1000):
+        # the table is already decoded in memory; each batch is copied under
+        # the read lock and yielded without it, so the caller may write
+        with self._reading():
+            doc_ids = list(self._member_index.values())
+        for start in range(0, len(doc_ids), batch_size):
+            with self._reading():
+                docs = [self.db.get(doc_id=doc_id) for doc_id in doc_ids[start:start + batch_size]]
+                records = [copy_record(doc) for doc in docs if doc is not None]
+            for record in records:
+                yield record
+
+    def batch(self):
+        if self.process_lock is None:
+            return self.middleware.batch()
+        return self._locked_batch()
+
+    @contextmanager
+    def _locked_batch(self):
+        # other processes wait for the whole batch, which is committed as one write
+        with self._writing(), self.middleware.batch():
+            yield self
+
+    def flush(self):
+        self.middleware.flush()
+
+    def close(self):
+        with self._writing():
+            self.db.close()
+        if self.process_lock is not None:
+            self.process_lock.close()
@@ -0,0 +1,86 @@
+"""
+Filename: reshard.py
+Description: changes the number of shards of a sharded patron database offline
+
+Usage: python -m library.reshard db.json OLD_SHARDS NEW_SHARDS
+
+A plain db.json can be split by renaming it to db-00.json and resharding from 1.
+"""
+
+import os
+import sys
+
+from library.sharded_patron_store import ShardedPatronStore, shard_index, shard_path
+
+CHUNK_SIZE = 1000
+
+def reshard(path, old_shards, new_shards):
+    """Moves every patron of a sharded database into a new number of shards.
+
+    The new shards are written next to the old ones and only renamed into
+    place once complete, so a failure while copying leaves the old shards
+    untouched. No other process may use the database meanwhile.
+
+    :param path: the path of the unsharded database, e.g. db.json
+    :param old_shards: the current number of shards
+    :param new_shards: the wanted number of shards
+    :returns: the number of patrons moved
+    """
+    for index in range(old_shards):
+        if not os.path.exists(shard_path(path, index)):
+            raise ValueError('%s is missing, %s has fewer than %d shards' % (shard_path(path, index), path, old_shards))
+    if os.path.exists(shard_path(path, old_shards)):
+        raise ValueError('%s exists, %s has more than %d shards' % (shard_path(path, old_shards), path, old_shards))
+    root, ext = os.path.splitext(path)
+    new_path = root + '.reshard' + ext
+    _remove_shards(new_path, range(new_shards))
+    source = ShardedPatronStore(path, old_shards)
+    target = ShardedPatronStore(new_path, new_shards)
+    moved = 0
+    try:
+        chunk = []
+        with target.batch():
+            for index, shard in enumerate(source.shards):
+                for record in shard.iter_records(CHUNK_SIZE):
+                    # a record hashed elsewhere means old_shards is not the count the files were written with
+                    if shard_index(record['memberID'], old_shards) != index:
+                        raise ValueError('memberID %s does not belong in %s, %s does not have %d shards'
+                                         % (record['memberID'], shard_path(path, index), path, old_shards))
+                    chunk.append(record)
+                    if len(chunk) >= CHUNK_SIZE:
+                        target.insert_many(chunk)
+                        moved += len(chunk)
+                        chunk = []
+            if chunk:
+                target.insert_many(chunk)
+                moved += len(chunk)
+    except Exception:
+        source.close()
+        target.close()
+        _remove_shards(new_path, range(new_shards))
+        raise
+    source.close()
+    target.close()
+    # the new shards replace the old ones first, so every patron is always in some file
+    for index in range(new_shards):
+        os.replace(shard_path(new_path, index), shard_path(path, index))
+    _remove_shards(path, range(new_shards, old_shards))
+    return moved
+
+def _remove_shards(path, indexes):
+    for index in indexes:
+        if os.path.exists(shard_path(path, index)):
+            os.remove(shard_path(path, index))
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 3:
+        print("Usage: python -m library.reshard db.json OLD_SHARDS NEW_SHARDS")
+        return 2
+    path, old_shards, new_shards = args[0], int(args[1]), int(args[2])
+    moved = reshard(path, old_shards, new_shards)
+    print("Moved %d patrons from %d to %d shards of %s" % (moved, old_shards, new_shards, path))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
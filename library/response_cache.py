@@ -0,0 +1,111 @@
+"""
+Filename: response_cache.py
+Description: size-bounded LRU cache with per-entry expiry for web service responses
+"""
+
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import threading
+import time
+
+
+def normalize_url(url):
+    """Normalizes a query URL so equivalent searches share a cache key.
+
+    The scheme and host are lowercased, query parameters are sorted and their
+    values are lowercased with surrounding and repeated whitespace collapsed.
+
+    :param url: the query URL
+    :returns: the normalized URL
+    """
+    parts = urlsplit(url)
+    query = sorted((key, ' '.join(value.lower().split()))
+                   for key, value in parse_qsl(parts.query, keep_blank_values=True))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path,
+                       urlencode(query), ''))
+
+
+class ResponseCache:
+    """LRU cache of responses where every entry expires after a TTL.
+
+    Negative results (None) are cached with their own, usually shorter, TTL
+    so an unreachable or empty lookup is retried sooner than a good one.
+    """
+
+    MAXSIZE = 1024
+    TTL = 300
+    NEGATIVE_TTL = 30
+
+    def __init__(self, maxsize=None, ttl=None, negative_ttl=None, clock=time.monotonic):
+        """Constructor for the ResponseCache class.
+
+        :param maxsize: the maximum number of entries, 0 disables caching
+        :param ttl: seconds a response stays valid
+        :param negative_ttl: seconds a None response stays valid
+        :param clock: function returning the current time in seconds
+        """
+        self.maxsize = maxsize if maxsize is not None else self.MAXSIZE
+        self.ttl = ttl if ttl is not None else self.TTL
+        self.negative_ttl = negative_ttl if negative_ttl is not None else self.NEGATIVE_TTL
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Gets a cached value and marks it as recently used.
+
+        :param key: the cache key
+        :param default: the value returned on a miss
+        :returns: the cached value, or default if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires, value = entry
+            if expires <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Caches a value, evicting the least recently used entry if full.
+
+        :param key: the cache key
+        :param value: the value to cache, None is cached with the negative TTL
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = self.negative_ttl if value is None else self.ttl
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Removes every entry from the cache, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Gets the cache counters.
+
+        :returns: a dictionary with the hits, misses, evictions, expirations and size
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'expirations': self.expirations, 'size': len(self._entries)}
+
+    def __len__(self):
+        return len(self._entries)
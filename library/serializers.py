@@ -0,0 +1,107 @@
+"""
+Filename: serializers.py
+Description: interchangeable encoders for the database file, from the stdlib json module to orjson and msgpack
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError: # optional, the stdlib serializer is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError: # optional
+    msgpack = None
+
+
+class JSONSerializer:
+    """Encodes the database with the stdlib json module."""
+
+    name = 'json'
+
+    def dumps(self, data):
+        """Encodes the database.
+
+        :param data: the database as nested dictionaries
+        :returns: the encoded bytes
+        """
+        return json.dumps(data).encode('utf-8')
+
+    def loads(self, raw):
+        """Decodes the database.
+
+        :param raw: the encoded bytes
+        :returns: the database as nested dictionaries
+        """
+        return json.loads(raw)
+
+
+class OrjsonSerializer(JSONSerializer):
+    """Encodes the database as JSON with orjson, several times faster than json.
+
+    The output is compact JSON that the stdlib json module reads back, so a
+    file can be switched between the two freely. Data orjson cannot encode,
+    such as ints wider than 64 bits, is written with the stdlib json module
+    instead. NaN and infinite floats are written as null; set
+    Library_DB.SERIALIZER to 'json' if they must be kept.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        """Constructor for the OrjsonSerializer class."""
+        if orjson is None:
+            raise ImportError('the orjson serializer needs the orjson package')
+
+    def dumps(self, data):
+        # TinyDB document IDs can be ints, which json turns into strings on its own
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError: # orjson.JSONEncodeError is a TypeError
+            return super(OrjsonSerializer, self).dumps(data)
+
+    def loads(self, raw):
+        return orjson.loads(raw)
+
+
+class MsgpackSerializer(JSONSerializer):
+    """Encodes the database as MessagePack, a binary format.
+
+    Files written this way are not JSON, so give them their own name
+    (e.g. db.msgpack) and read them only with this serializer.
+    """
+
+    name = 'msgpack'
+
+    def __init__(self):
+        """Constructor for the MsgpackSerializer class."""
+        if msgpack is None:
+            raise ImportError('the msgpack serializer needs the msgpack package')
+
+    def dumps(self, data):
+        return msgpack.packb(data)
+
+    def loads(self, raw):
+        # document IDs are kept as int keys
+        return msgpack.unpackb(raw, strict_map_key=False)
+
+
+SERIALIZERS = {serializer.name: serializer for serializer in (JSONSerializer, OrjsonSerializer, MsgpackSerializer)}
+
+def get_serializer(serializer=None):
+    """Gets a serializer by name, or the fastest JSON one available.
+
+    :param serializer: a serializer object, its name, or None for orjson if installed and json otherwise
+    :returns: the serializer object
+    """
+    if serializer is None:
+        return OrjsonSerializer() if orjson is not None else JSONSerializer()
+    if isinstance(serializer, str):
+        try:
+            return SERIALIZERS[serializer]()
+        except KeyError:
+            raise ValueError('unknown serializer %r, expected one of %s'
+                             % (serializer, ', '.join(sorted(SERIALIZERS))))
+    return serializer
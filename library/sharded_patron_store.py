@@ -0,0 +1,151 @@
+"""
+Filename: sharded_patron_store.py
+Description: patron storage split across several database files by memberID
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+import os
+import zlib
+
+from library.patron_store import PatronStore, TinyDBPatronStore
+
+def shard_path(path, index):
+    """Gets the file name of one shard, e.g. db-03.json for db.json.
+
+    :param path: the path of the unsharded database
+    :param index: the number of the shard
+    :returns: the path of the shard
+    """
+    root, ext = os.path.splitext(path)
+    return '%s-%02d%s' % (root, index, ext)
+
+def shard_index(memberID, shards):
+    """Picks the shard of a patron.
+
+    CRC-32 of the memberID's text is used rather than hash(), which changes
+    between runs for strings, so every process agrees on the shard.
+
+    :param memberID: the ID of the patron
+    :param shards: the number of shards
+    :returns: the number of the shard
+    """
+    return zlib.crc32(str(memberID).encode('utf-8')) % shards
+
+
+class ShardedPatronStore(PatronStore):
+    """Patron records spread over several stores by a stable hash of memberID.
+
+    Point operations touch only the shard owning the memberID. Scans and
+    counts fan out to every shard, one after the other, or on a thread pool
+    when workers is given. Records come back grouped by shard. The number of
+    shards is fixed for a set of files; change it offline with
+    library.reshard.
+    """
+
+    SHARDS = 16
+
+    def __init__(self, path, shards=None, workers=None, store_factory=None):
+        """Constructor for the ShardedPatronStore class.
+
+        :param path: the path of the unsharded database, e.g. db.json for db-00.json to db-15.json
+        :param shards: the number of shards
+        :param workers: the number of threads used to fan out scans, None to scan one shard at a time
+        :param store_factory: builds the store of one shard from its path, a TinyDBPatronStore by default
+        """
+        self.path = path
+        shards = shards if shards is not None else self.SHARDS
+        if shards < 1:
+            raise ValueError('a sharded store needs at least one shard')
+        store_factory = store_factory if store_factory is not None else TinyDBPatronStore
+        self.shards = [store_factory(shard_path(path, index)) for index in range(shards)]
+        self._executor = ThreadPoolExecutor(workers) if workers else None
+
+    def shard_for(self, memberID):
+        """Gets the store holding a patron.
+
+        :param memberID: the ID of the patron
+        :returns: the PatronStore of the patron's shard
+        """
+        return self.shards[shard_index(memberID, len(self.shards))]
+
+    def _fan_out(self, func):
+        """Calls func on every shard.
+
+        :param func: a function taking a shard store
+        :returns: a list of the results, in shard order
+        """
+        if self._executor is None:
+            return [func(shard) for shard in self.shards]
+        return list(self._executor.map(func, self.shards))
+
+    def get(self, memberID):
+        return self.shard_for(memberID).get(memberID)
+
+    def contains(self, memberID):
+        return self.shard_for(memberID).contains(memberID)
+
+    def insert(self, record):
+        return self.shard_for(record['memberID']).insert(record)
+
+    def insert_many(self, records):
+        by_shard = {}
+        for position, record in enumerate(records):
+            by_shard.setdefault(shard_index(record['memberID'], len(self.shards)), []).append(position)
+        doc_ids = [None] * len(records)
+        for index, positions in by_shard.items():
+            ids = self.shards[index].insert_many([records[position] for position in positions])
+            for position, doc_id in zip(positions, ids):
+                doc_ids[position] = doc_id
+        return doc_ids
+
+    def update(self, memberID, record):
+        return self.shard_for(memberID).update(memberID, record)
+
+    def delete(self, memberID):
+        return self.shard_for(memberID).delete(memberID)
+
+    def count(self):
+        return sum(self._fan_out(lambda shard: shard.count()))
+
+    def all(self):
+        return [record for records in self._fan_out(lambda shard: shard.all()) for record in records]
+
+    def get_borrowers(self, title):
+        return set().union(*self._fan_out(lambda shard: shard.get_borrowers(title)))
+
+    def count_borrowers(self, title):
+        return sum(self._fan_out(lambda shard: shard.count_borrowers(title)))
+
+    def iter_records(self, batch_size=1000):
+        for shard in self.shards:
+            for record in shard.iter_records(batch_size):
+                yield record
+
+    @contextmanager
+    def batch(self):
+        with ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.batch())
+            yield self
+
+    @contextmanager
+    def exclusive(self, memberID=None):
+        if memberID is not None:
+            with self.shard_for(memberID).exclusive(memberID):
+                yield self
+            return
+        # always in shard order, so two callers cannot deadlock
+        with ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.exclusive())
+            yield self
+
+    def flush(self):
+        self._fan_out(lambda shard: shard.flush())
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        if self._executor is not None:
+            self._executor.shutdown()
@@ -0,0 +1,65 @@
+"""
+Filename: single_flight.py
+Description: coalesces concurrent calls for the same key onto one execution
+"""
+
+import threading
+
+
+class _Call:
+    """A call in progress and the outcome shared with everyone waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time.
+
+    Callers that arrive while a call for the same key is in flight wait for
+    it and receive its result (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        """Constructor for the SingleFlight class."""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Calls func, or joins the call already running for key.
+
+        :param key: identifies equivalent calls
+        :param func: callable taking no arguments
+        :returns: the return value of the call that ran
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """Gets the number of calls currently running.
+
+        :returns: the number of keys with a call in flight
+        """
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,169 @@
+"""
+Filename: snapshot_store.py
+Description: compact binary snapshot of the patrons, opened read-only with mmap
+
+File layout, all integers little-endian:
+    header   magic b'PATRSNAP', format version (u32), number of patrons (u32)
+    index    one entry per patron sorted by key: key offset (u64), key length (u32),
+             record offset (u64), record length (u32)
+    keys     the memberIDs encoded as JSON text, so 7 and '7' stay distinct
+    records  each patron record encoded with the default serializer (JSON)
+"""
+
+import json
+import mmap
+import os
+import struct
+
+from library.patron_store import PatronStore
+from library.serializers import get_serializer
+
+MAGIC = b'PATRSNAP'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+ENTRY = struct.Struct('<QIQI')
+
+_key_encoder = json.JSONEncoder(ensure_ascii=False)
+
+
+class ReadOnlyStoreError(Exception):
+    """Custom Exception for a write to a read-only store."""
+    pass
+
+
+def encode_key(memberID):
+    """Encodes a memberID the way the snapshot index stores it.
+
+    :param memberID: the ID of the patron
+    :returns: the key bytes
+    """
+    return _key_encoder.encode(memberID).encode('utf-8')
+
+def write_snapshot(records, path):
+    """Writes patron records to a snapshot file.
+
+    The file is written under a temporary name and renamed into place, so
+    processes that have the old snapshot mapped keep reading it undisturbed.
+
+    :param records: an iterable of patron records
+    :param path: the path of the snapshot
+    :returns: the number of patrons written
+    """
+    serializer = get_serializer()
+    entries = sorted((encode_key(record['memberID']), serializer.dumps(record)) for record in records)
+    for previous, entry in zip(entries, entries[1:]):
+        if previous[0] == entry[0]:
+            raise ValueError('memberID %s appears twice' % entry[0].decode('utf-8'))
+    keys_offset = HEADER.size + ENTRY.size * len(entries)
+    records_offset = keys_offset + sum(len(key) for key, _ in entries)
+    tmp_path = '%s.tmp.%d' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+        index = bytearray(ENTRY.size * len(entries))
+        key_offset, record_offset = keys_offset, records_offset
+        for position, (key, record) in enumerate(entries):
+            ENTRY.pack_into(index, ENTRY.size * position, key_offset, len(key), record_offset, len(record))
+            key_offset += len(key)
+            record_offset += len(record)
+        f.write(index)
+        f.write(b''.join(key for key, _ in entries))
+        f.write(b''.join(record for _, record in entries))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+class SnapshotPatronStore(PatronStore):
+    """Read-only patron store over a memory-mapped snapshot file.
+
+    Opening only maps the file and reads its header, so it costs the same
+    for ten patrons or a million, and the operating system shares the
+    mapped pages between every process reading the same snapshot. Lookups
+    binary-search the sorted index and decode a single record. Writes
+    raise ReadOnlyStoreError; build a new snapshot with write_snapshot or
+    Library_DB.export_snapshot instead.
+    """
+
+    def __init__(self, path):
+        """Constructor for the SnapshotPatronStore class.
+
+        :param path: the path of the snapshot file
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # an empty file cannot be mapped
+            self._file.close()
+            raise ValueError('%s is not a patron snapshot' % path)
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError('%s is not a patron snapshot' % path)
+        magic, version, self._count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError('%s is not a version %d patron snapshot' % (path, VERSION))
+        self._serializer = get_serializer()
+
+    def _entry(self, position):
+        return ENTRY.unpack_from(self._map, HEADER.size + ENTRY.size * position)
+
+    def _find(self, memberID):
+        """Binary-searches the index for a memberID.
+
+        :param memberID: the ID of the patron
+        :returns: the index entry, or None
+        """
+        key = encode_key(memberID)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            probe = self._map[entry[0]:entry[0] + entry[1]]
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return entry
+        return None
+
+    def _record(self, entry):
+        return self._serializer.loads(self._map[entry[2]:entry[2] + entry[3]])
+
+    def get(self, memberID):
+        entry = self._find(memberID)
+        if entry is None:
+            return None
+        return self._record(entry)
+
+    def contains(self, memberID):
+        return self._find(memberID) is not None
+
+    def insert(self, record):
+        raise ReadOnlyStoreError('%s is a read-only snapshot' % self.path)
+
+    def insert_many(self, records):
+        raise ReadOnlyStoreError('%s is a read-only snapshot' % self.path)
+
+    def update(self, memberID, record):
+        raise ReadOnlyStoreError('%s is a read-only snapshot' % self.path)
+
+    def delete(self, memberID):
+        raise ReadOnlyStoreError('%s is a read-only snapshot' % self.path)
+
+    def count(self):
+        return self._count
+
+    def all(self):
+        return list(self.iter_records())
+
+    def iter_records(self, batch_size=1000):
+        # in memberID key order
+        for position in range(self._count):
+            yield self._record(self._entry(position))
+
+    def close(self):
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,206 @@
+"""
+Filename: sqlite_patron_store.py
+Description: patron storage backend using SQLite
+"""
+
+from contextlib import contextmanager
+import sqlite3
+
+from library.locks import ReadWriteLock
+from library.patron_store import PatronStore
+
+# memberID and age are left without a declared type so SQLite keeps whatever
+# type the caller stored (the library uses both strings and integers)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patrons (
+    id INTEGER PRIMARY KEY,
+    memberID NOT NULL UNIQUE,
+    fname TEXT NOT NULL,
+    lname TEXT NOT NULL,
+    age
+);
+CREATE TABLE IF NOT EXISTS borrowed_books (
+    patron_id INTEGER NOT NULL REFERENCES patrons(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    PRIMARY KEY (patron_id, title)
+);
+CREATE INDEX IF NOT EXISTS borrowed_books_title ON borrowed_books(title);
+CREATE TABLE IF NOT EXISTS patron_count (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    patrons INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS patron_count_insert AFTER INSERT ON patrons BEGIN
+    UPDATE patron_count SET patrons = patrons + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS patron_count_delete AFTER DELETE ON patrons BEGIN
+    UPDATE patron_count SET patrons = patrons - 1;
+END;
+"""
+
+class SQLitePatronStore(PatronStore):
+    """Patron records kept in a SQLite database.
+
+    Patrons live in a patrons table with a unique index on memberID and their
+    books in a borrowed_books table indexed by title, so updates only rewrite
+    the rows of one patron. The database runs in WAL mode.
+
+    One connection is shared by every thread: reads share a ReadWriteLock and
+    each write transaction holds it exclusively.
+
+    SQLite's COUNT(*) scans the whole table, so the number of patrons is kept
+    in a one-row patron_count table that triggers on patrons update within
+    the writing transaction.
+    """
+
+    def __init__(self, path):
+        """Constructor for the SQLitePatronStore class.
+
+        :param path: the path of the SQLite database file
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+        if self.conn.execute('SELECT 1 FROM patron_count').fetchone() is None:
+            # a new database, or one written before the counter existed
+            with self.conn:
+                self.conn.execute('INSERT OR IGNORE INTO patron_count (id, patrons) SELECT 0, COUNT(*) FROM patrons')
+        self.lock = ReadWriteLock()
+        self._batch_depth = 0
+
+    @contextmanager
+    def _transaction(self):
+        """Runs the block in a transaction, or in the enclosing batch's transaction."""
+        with self.lock.write_lock():
+            if self._batch_depth:
+                yield
+            else:
+                with self.conn:
+                    yield
+
+    @contextmanager
+    def batch(self):
+        # a group commit rather than an atomic transaction: like the TinyDB
+        # store, writes made before an exception in the block are kept
+        with self.lock.write_lock():
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self.lock.write_lock():
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.conn.commit()
+
+    def _borrowed_books(self, patron_id):
+        rows = self.conn.execute(
+            'SELECT title FROM borrowed_books WHERE patron_id = ? ORDER BY position',
+            (patron_id,))
+        return [row[0] for row in rows]
+
+    def _insert_books(self, patron_id, books):
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO borrowed_books (patron_id, position, title) VALUES (?, ?, ?)',
+            [(patron_id, position, title) for position, title in enumerate(books)])
+
+    def _insert(self, record):
+        cursor = self.conn.execute(
+            'INSERT INTO patrons (memberID, fname, lname, age) VALUES (?, ?, ?, ?)',
+            (record['memberID'], record['fname'], record['lname'], record['age']))
+        self._insert_books(cursor.lastrowid, record['borrowed_books'])
+        return cursor.lastrowid
+
+    def _to_record(self, row):
+        patron_id, memberID, fname, lname, age = row
+        return {'fname': fname, 'lname': lname, 'age': age, 'memberID': memberID,
+                'borrowed_books': self._borrowed_books(patron_id)}
+
+    def get(self, memberID):
+        with self.lock.read_lock():
+            row = self.conn.execute(
+                'SELECT id, memberID, fname, lname, age FROM patrons WHERE memberID = ?',
+                (memberID,)).fetchone()
+            if row is None:
+                return None
+            return self._to_record(row)
+
+    def contains(self, memberID):
+        with self.lock.read_lock():
+            row = self.conn.execute('SELECT 1 FROM patrons WHERE memberID = ?', (memberID,)).fetchone()
+            return row is not None
+
+    def insert(self, record):
+        with self._transaction():
+            return self._insert(record)
+
+    def insert_many(self, records):
+        with self._transaction():
+            return [self._insert(record) for record in records]
+
+    def update(self, memberID, record):
+        with self._transaction():
+            row = self.conn.execute('SELECT id FROM patrons WHERE memberID = ?', (memberID,)).fetchone()
+            if row is None:
+                return False
+            self.conn.execute('UPDATE patrons SET fname = ?, lname = ?, age = ? WHERE id = ?',
+                              (record['fname'], record['lname'], record['age'], row[0]))
+            self.conn.execute('DELETE FROM borrowed_books WHERE patron_id = ?', (row[0],))
+            self._insert_books(row[0], record['borrowed_books'])
+            return True
+
+    def delete(self, memberID):
+        with self._transaction():
+            cursor = self.conn.execute('DELETE FROM patrons WHERE memberID = ?', (memberID,))
+            return cursor.rowcount > 0
+
+    def count(self):
+        with self.lock.read_lock():
+            return self.conn.execute('SELECT patrons FROM patron_count').fetchone()[0]
+
+    def all(self):
+        with self.lock.read_lock():
+            books = {}
+            for patron_id, title in self.conn.execute(
+                    'SELECT patron_id, title FROM borrowed_books ORDER BY patron_id, position'):
+                books.setdefault(patron_id, []).append(title)
+            rows = self.conn.execute('SELECT id, memberID, fname, lname, age FROM patrons ORDER BY id')
+            return [{'fname': fname, 'lname': lname, 'age': age, 'memberID': memberID,
+                     'borrowed_books': books.get(patron_id, [])}
+                    for patron_id, memberID, fname, lname, age in rows]
+
+    def get_borrowers(self, title):
+        with self.lock.read_lock():
+            rows = self.conn.execute(
+                'SELECT patrons.memberID FROM borrowed_books JOIN patrons ON patrons.id = borrowed_books.patron_id '
+                'WHERE borrowed_books.title = ?', (title,))
+            return set(row[0] for row in rows)
+
+    def count_borrowers(self, title):
+        with self.lock.read_lock():
+            return self.conn.execute('SELECT COUNT(*) FROM borrowed_books WHERE title = ?', (title,)).fetchone()[0]
+
+    def iter_records(self, batch_size=1000):
+        last_id = 0
+        while True:
+            with self.lock.read_lock():
+                rows = self.conn.execute(
+                    'SELECT id, memberID, fname, lname, age FROM patrons WHERE id > ? ORDER BY id LIMIT ?',
+                    (last_id, batch_size)).fetchall()
+                if not rows:
+                    return
+                books = {}
+                for patron_id, title in self.conn.execute(
+                        'SELECT patron_id, title FROM borrowed_books WHERE patron_id BETWEEN ? AND ? '
+                        'ORDER BY patron_id, position', (rows[0][0], rows[-1][0])):
+                    books.setdefault(patron_id, []).append(title)
+            for patron_id, memberID, fname, lname, age in rows:
+                yield {'fname': fname, 'lname': lname, 'age': age, 'memberID': memberID,
+                       'borrowed_books': books.get(patron_id, [])}
+            last_id = rows[-1][0]
+
+    def close(self):
+        with self.lock.write_lock():
+            self.conn.close()
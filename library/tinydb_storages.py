@@ -0,0 +1,380 @@
+"""
+Filename: tinydb_storages.py
+Description: TinyDB storages and middlewares used by the patron database
+"""
+
+from contextlib import contextmanager
+import gc
+import json
+import os
+import threading
+
+from tinydb.database import StorageProxy
+from tinydb.middlewares import CachingMiddleware
+from tinydb.storages import JSONStorage, Storage, touch
+
+from library.locks import ReadWriteLock
+from library.serializers import get_serializer
+
+class CachedStorageProxy(StorageProxy):
+    """StorageProxy that keeps its decoded table while the storage data is unchanged.
+
+    TinyDB's proxy rebuilds a Document for every row on each operation. When
+    the storage hands back the same data object as last time (as a caching
+    middleware does) this proxy returns the table it built before, and it
+    writes that table back in place instead of copying it, so point
+    operations no longer cost time proportional to the table size.
+    """
+
+    def __init__(self, storage, table_name):
+        super(CachedStorageProxy, self).__init__(storage, table_name)
+        self._table = None
+
+    def read(self):
+        raw_data = self._storage.read()
+        if self._table is not None and raw_data is self._table.raw_data:
+            return self._table
+        self._table = super(CachedStorageProxy, self).read()
+        return self._table
+
+    def write(self, data):
+        if data is not self._table:
+            self._table = None
+            super(CachedStorageProxy, self).write(data)
+            return
+        data.raw_data[self._table_name] = data
+        self._storage.write(data.raw_data)
+
+class GroupCommitMiddleware(CachingMiddleware):
+    """Buffers writes in memory and commits them to the storage as a group.
+
+    The buffered state is written once write_cache_size writes have piled up,
+    or flush_interval seconds after the first unwritten write, whichever comes
+    first. Inside batch() nothing is written until the outermost batch ends.
+    With the defaults every write goes straight to the storage.
+
+    Callers that change the cached state from several threads hold the write
+    side of lock while doing so. A flush takes the read side, so the state it
+    serializes is never half way through a change, even when the flush runs
+    on the flush_interval timer thread.
+    """
+
+    WRITE_CACHE_SIZE = 1
+    FLUSH_INTERVAL = None
+
+    def __init__(self, storage_cls=JSONStorage, write_cache_size=None, flush_interval=None, lock=None):
+        """Constructor for the GroupCommitMiddleware class.
+
+        :param storage_cls: the storage class the writes are committed to
+        :param write_cache_size: the number of writes buffered before a flush
+        :param flush_interval: the maximum seconds a write stays buffered, None for no limit
+        :param lock: the ReadWriteLock guarding the cached state, a new one by default
+        """
+        super(GroupCommitMiddleware, self).__init__(storage_cls)
+        self.write_cache_size = write_cache_size if write_cache_size is not None else self.WRITE_CACHE_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else self.FLUSH_INTERVAL
+        self.lock = lock if lock is not None else ReadWriteLock()
+        self._lock = threading.RLock()
+        self._timer = None
+        self._batch_depth = 0
+
+    def write(self, data):
+        with self._lock:
+            self.cache = data
+            self._cache_modified_count += 1
+            if self._batch_depth:
+                return
+            if self._cache_modified_count >= self.write_cache_size:
+                self.flush()
+            elif self.flush_interval is not None and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Writes the buffered state to the storage if anything changed."""
+        with self.lock.read_lock(), self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            super(GroupCommitMiddleware, self).flush()
+
+    def pending_writes(self):
+        """Gets the number of writes not yet committed to the storage.
+
+        :returns: the number of buffered writes
+        """
+        return self._cache_modified_count
+
+    @contextmanager
+    def batch(self):
+        """Buffers every write made inside the block and commits them together at its end."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                done = not self._batch_depth
+            # flush() takes lock before _lock, so it is called without holding _lock
+            if done:
+                self.flush()
+
+    def close(self):
+        self.flush()
+        self.storage.close()
+
+
+class SerializedStorage(JSONStorage):
+    """JSONStorage with a pluggable serializer.
+
+    By default the file is written with orjson when it is installed and with
+    the stdlib json module otherwise; both produce ordinary JSON, so db.json
+    stays readable by either. See library.serializers for the choices.
+    """
+
+    def __init__(self, path, serializer=None, create_dirs=False):
+        """Constructor for the SerializedStorage class.
+
+        :param path: the path of the database file, created if missing
+        :param serializer: a serializer object or name, None for the fastest JSON one available
+        :param create_dirs: True to create missing parent directories
+        """
+        # JSONStorage's constructor opens a text handle, a binary one is needed here
+        Storage.__init__(self)
+        touch(path, create_dirs=create_dirs)
+        self.serializer = get_serializer(serializer)
+        self._handle = open(path, 'r+b')
+
+    def read(self):
+        self._handle.seek(0)
+        raw = self._handle.read()
+        if not raw:
+            return None
+        # decoding creates a container per document but no reference cycles,
+        # so collections triggered meanwhile would only slow it down
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return self.serializer.loads(raw)
+        finally:
+            if collecting:
+                gc.enable()
+
+    def write(self, data):
+        self._handle.seek(0)
+        self._handle.write(self.serializer.dumps(data))
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._handle.truncate()
+
+
+class AppendLogStorage(Storage):
+    """Storage that appends document mutations to a log instead of rewriting the file.
+
+    The database is a JSON snapshot at path (the same format JSONStorage
+    uses, so an existing db.json opens as is) plus a log at path + '.log'
+    with one JSON line per inserted, updated or deleted document. Opening
+    the storage loads the snapshot, replays the log and cuts off an append
+    torn by a crash. Once the log grows
+    past compact_threshold bytes a background thread writes a fresh
+    snapshot and starts the log over.
+
+    Writers say which documents changed by calling mark_dirty, inside a
+    describing() block because TinyDB only reports the IDs of inserted
+    documents after it has written them. A write not described that way is
+    saved at once by rewriting the whole snapshot, so the storage stays
+    correct when used by plain TinyDB code.
+    """
+
+    COMPACT_THRESHOLD = 4 * 1024 * 1024
+
+    def __init__(self, path, compact_threshold=None, fsync=True):
+        """Constructor for the AppendLogStorage class.
+
+        :param path: the path of the snapshot file
+        :param compact_threshold: the log size in bytes that triggers a compaction
+        :param fsync: True to fsync the log after every append
+        """
+        super(AppendLogStorage, self).__init__()
+        self.path = path
+        self.log_path = path + '.log'
+        self.old_log_path = path + '.log.old'
+        self.compact_threshold = compact_threshold if compact_threshold is not None else self.COMPACT_THRESHOLD
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_generation = 0
+        self._dirty = set()
+        self._pending = False
+        self._describing = 0
+        self._compactor = None
+        touch(path, create_dirs=False)
+        self.data = self._load()
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+
+    def _load(self):
+        data = None
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        for log_path in (self.old_log_path, self.log_path):
+            if not os.path.exists(log_path):
+                continue
+            good = 0
+            with open(log_path, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError
+                        entry = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        break  # an append torn by a crash
+                    data = self._apply(data if data is not None else {}, entry)
+                    good += len(line)
+            # later appends must start on a fresh line, not after the torn bytes
+            if log_path == self.log_path and os.path.getsize(log_path) > good:
+                os.truncate(log_path, good)
+        return data
+
+    def _apply(self, data, entry):
+        table = data.setdefault(entry['t'], {})
+        key = _table_key(table, entry['id'])
+        if entry['op'] == 'd':
+            table.pop(key, None)
+        else:
+            table[key] = entry['doc']
+        return data
+
+    def read(self):
+        return self.data
+
+    def write(self, data):
+        with self._lock:
+            self.data = data
+            if self._dirty:
+                self._append_dirty()
+            elif self._pending or not self._describing:
+                self._write_snapshot()
+            else:
+                self._pending = True
+
+    @contextmanager
+    def describing(self):
+        """Holds back the writes made in the block until mark_dirty describes them.
+
+        A write still undescribed when the outermost block ends is saved by
+        rewriting the snapshot.
+        """
+        with self._lock:
+            self._describing += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._describing -= 1
+                if not self._describing and self._pending:
+                    self._write_snapshot()
+
+    def mark_dirty(self, table, doc_ids):
+        """Records which documents the last write changed so they are logged.
+
+        :param table: the name of the table
+        :param doc_ids: the IDs of the inserted, updated or deleted documents
+        """
+        with self._lock:
+            self._dirty.update((table, doc_id) for doc_id in doc_ids)
+            if self._pending:
+                self._append_dirty()
+
+    def _append_dirty(self):
+        lines = []
+        for table_name, doc_id in sorted(self._dirty):
+            table = (self.data or {}).get(table_name, {})
+            doc = table.get(_table_key(table, doc_id))
+            if doc is None:
+                lines.append(json.dumps({'op': 'd', 't': table_name, 'id': doc_id}))
+            else:
+                lines.append(json.dumps({'op': 'u', 't': table_name, 'id': doc_id, 'doc': doc}))
+        self._dirty.clear()
+        self._pending = False
+        if not lines:
+            return
+        self._log.write('\n'.join(lines) + '\n')
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        if self._log.tell() >= self.compact_threshold and self._compactor is None:
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def _write_snapshot(self):
+        """Rewrites the whole snapshot and empties the log."""
+        self._dirty.clear()
+        self._pending = False
+        with self._snapshot_lock:
+            self._snapshot_generation += 1
+            _write_json_atomic(self.path, self.data or {})
+            self._log.truncate(0)
+            self._log.seek(0)
+            if os.path.exists(self.old_log_path):
+                os.remove(self.old_log_path)
+
+    def compact(self):
+        """Writes the current state as the snapshot and drops the log entries it covers.
+
+        Writers only wait while the state is copied and the log is rotated;
+        serializing and syncing the snapshot happens without the lock.
+        """
+        try:
+            with self._lock:
+                generation = self._snapshot_generation
+                # list() takes each table's items in one step, so a document
+                # inserted meanwhile cannot break the copy
+                state = {name: {key: dict(doc) for key, doc in list(table.items())}
+                         for name, table in list((self.data or {}).items())}
+                self._log.close()
+                os.replace(self.log_path, self.old_log_path)
+                self._log = open(self.log_path, 'a', encoding='utf-8')
+            with self._snapshot_lock:
+                # a full snapshot written meanwhile is newer than this state
+                if generation == self._snapshot_generation:
+                    _write_json_atomic(self.path, state)
+                if os.path.exists(self.old_log_path):
+                    os.remove(self.old_log_path)
+        finally:
+            self._compactor = None
+
+    def wait_for_compaction(self):
+        """Blocks until a running background compaction has finished."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def close(self):
+        self.wait_for_compaction()
+        with self._lock:
+            if self._dirty:
+                self._append_dirty()
+            elif self._pending:
+                self._write_snapshot()
+            self._log.close()
+
+
+def _table_key(table, doc_id):
+    """Gets the key a document ID is stored under, which is a str when read from JSON."""
+    if doc_id in table:
+        return doc_id
+    if str(doc_id) in table:
+        return str(doc_id)
+    return doc_id
+
+
+def _write_json_atomic(path, data):
+    tmp_path = '%s.%d.tmp' % (path, threading.get_ident())
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,125 @@
+"""
+Filename: api_stub_server.py
+Description: local stand-in for the OpenLibrary search endpoint used by tests and benchmarks
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+API_DATA_FILE = 'tests_data/api_data.json'
+
+
+def load_docs(path=API_DATA_FILE):
+    """Loads the sample search docs.
+
+    :param path: the path of the sample search response
+    :returns: the list of docs in the sample response
+    """
+    with open(path) as file:
+        docs = json.loads(file.read())['docs']
+    # the sample predates these fields, derive them the way the live API fills them
+    for doc in docs:
+        doc.setdefault('title_suggest', doc['title'])
+        doc.setdefault('ebook_count_i', 1 if doc.get('has_fulltext') else 0)
+    return docs
+
+
+def search_docs(docs, query):
+    """Filters the sample docs the same way the search endpoint would.
+
+    :param docs: the sample docs
+    :param query: the parsed query string of the request
+    :returns: the docs matching the query
+    """
+    if 'q' in query:
+        term = query['q'][0].upper()
+        return [book for book in docs if term in book['title'].upper()
+                or any(term in author.upper() for author in book.get('author_name', []))]
+    if 'author' in query:
+        term = query['author'][0].upper()
+        return [book for book in docs
+                if any(term in author.upper() for author in book.get('author_name', []))]
+    return []
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    """Request handler answering /search.json with keep-alive responses."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/search.json':
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        docs = search_docs(self.server.docs, query)
+        found = len(docs)
+        offset = int(query['offset'][0]) if 'offset' in query else 0
+        docs = docs[offset:]
+        if 'limit' in query:
+            docs = docs[:int(query['limit'][0])]
+        if 'fields' in query:
+            fields = query['fields'][0].split(',')
+            docs = [{key: doc[key] for key in fields if key in doc} for doc in docs]
+        body = json.dumps({
+            'numFound': found,
+            'start': offset,
+            'numFoundExact': True,
+            'num_found': found,
+            'q': query.get('q', [''])[0],
+            'offset': offset if 'offset' in query else None,
+            'docs': docs
+        }).encode('utf-8')
+        self.server.request_count += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Runs the stand-in search endpoint on a background thread."""
+
+    def __init__(self, docs=None):
+        """Constructor for the StubServer class.
+
+        :param docs: the docs to serve, defaults to the sample API data
+        """
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), SearchHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.docs = docs if docs is not None else load_docs()
+        self.httpd.request_count = 0
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def api_url(self):
+        """The search URL of the running server."""
+        host, port = self.httpd.server_address
+        return 'http://%s:%d/search.json' % (host, port)
+
+    @property
+    def request_count(self):
+        """The number of search requests served so far."""
+        return self.httpd.request_count
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,64 @@
+"""
+Filename: bench_group_commit.py
+Description: checkout throughput of write-through TinyDB storage against group commit, batch() and the append log
+
+Run from the repository root with: python -m tests.bench_group_commit
+"""
+
+import os
+import tempfile
+import time
+
+from library.library import Library
+from library.library_db_interface import Library_DB
+from library.patron import Patron
+from library.patron_store import TinyDBPatronStore
+from library.tinydb_storages import AppendLogStorage
+
+PATRONS = 2000
+CHECKOUTS = 300
+
+
+def run(name, store_kwargs, use_batch=False):
+    """Registers patrons, then times a burst of checkouts.
+
+    :param name: the label printed for the run
+    :param store_kwargs: arguments for TinyDBPatronStore
+    :param use_batch: True to run the checkouts inside Library_DB.batch()
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'db.json')
+    db = Library_DB(store=TinyDBPatronStore(path, **store_kwargs))
+    library = Library(db=db)
+    patrons = [Patron('fname', 'lname', 30, 'M%06d' % i) for i in range(PATRONS)]
+    with db.batch():
+        for patron in patrons:
+            db.insert_patron(patron)
+
+    start = time.perf_counter()
+    if use_batch:
+        with db.batch():
+            for i in range(CHECKOUTS):
+                library.borrow_book('book %d' % i, patrons[i % PATRONS])
+    else:
+        for i in range(CHECKOUTS):
+            library.borrow_book('book %d' % i, patrons[i % PATRONS])
+    db.close_db()
+    elapsed = time.perf_counter() - start
+    for suffix in ('', '.log'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    print('%-28s %9.0f checkouts/s' % (name, CHECKOUTS / elapsed))
+
+
+def main():
+    print('%d patrons, %d checkouts' % (PATRONS, CHECKOUTS))
+    run('write-through', {})
+    run('group commit (100 writes)', {'write_cache_size': 100})
+    run('group commit (1 s)', {'write_cache_size': 10 ** 9, 'flush_interval': 1.0})
+    run('batch()', {}, use_batch=True)
+    run('append log', {'storage': AppendLogStorage})
+    run('append log, no fsync', {'storage': AppendLogStorage, 'fsync': False})
+
+
+if __name__ == '__main__':
+    main()
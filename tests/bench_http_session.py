@@ -0,0 +1,60 @@
+"""
+Filename: bench_http_session.py
+Description: compares per-request latency of one-off requests.get calls with the pooled Books_API session
+
+Run from the repository root with: python -m tests.bench_http_session
+"""
+
+import statistics
+import time
+
+import requests
+
+from library.ext_api_interface import Books_API
+from tests.api_stub_server import StubServer
+
+REQUESTS = 500
+
+
+def time_calls(fetch, url, count):
+    """Times repeated fetches of a URL.
+
+    :param fetch: callable taking the URL
+    :param url: the URL to fetch
+    :param count: the number of fetches
+    :returns: the per-request latencies in milliseconds
+    """
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fetch(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    print('%-22s mean %7.3f ms   median %7.3f ms   p95 %7.3f ms' % (
+        name, statistics.mean(latencies), statistics.median(latencies),
+        sorted(latencies)[int(len(latencies) * 0.95)]))
+
+
+def main():
+    with StubServer() as server:
+        url = '%s?q=%s' % (server.api_url, 'python')
+        api = Books_API()
+        # warm up both paths so the first connection is not counted; fetch
+        # skips the response cache, so every pooled call goes over the wire
+        requests.get(url).json()
+        api.fetch(url)
+
+        fresh = time_calls(lambda u: requests.get(u).json(), url, REQUESTS)
+        pooled = time_calls(api.fetch, url, REQUESTS)
+        api.close()
+
+    report('requests.get', fresh)
+    report('Books_API session', pooled)
+    print('speedup (mean): %.2fx' % (statistics.mean(fresh) / statistics.mean(pooled)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Filename: bench_patron_memory.py
+Description: measures memory per patron and construction time for a roster of Patron objects
+
+Run from the repository root with: python -m tests.bench_patron_memory [count]
+Exits with status 1 when a patron costs more than MAX_BYTES_PER_PATRON, so it
+can be used as a regression guard.
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from library.patron import Patron
+
+COUNT = 1000000
+MAX_BYTES_PER_PATRON = 440
+
+
+def build(count):
+    """Builds a roster of patrons, each holding one borrowed book.
+
+    :param count: the number of patrons
+    :returns: the list of patrons
+    """
+    patrons = []
+    for i in range(count):
+        patron = Patron('fname', 'lname', 30, 'M%07d' % i)
+        patron.add_borrowed_book('book')
+        patrons.append(patron)
+    return patrons
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else COUNT
+
+    start = time.perf_counter()
+    patrons = build(count)
+    construct = time.perf_counter() - start
+    del patrons
+    gc.collect()
+
+    tracemalloc.start()
+    patrons = build(count)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    gc.collect()
+    collect = time.perf_counter() - start
+
+    per_patron = used / count
+    print('%d patrons' % count)
+    print('construction      %8.3f s (%6.0f ns/patron)' % (construct, construct * 1e9 / count))
+    print('memory            %8.1f MB per 1M patrons (%5.0f bytes/patron)' % (per_patron, per_patron))
+    print('full gc.collect() %8.3f s' % collect)
+    del patrons
+    if per_patron > MAX_BYTES_PER_PATRON:
+        print('over budget of %d bytes/patron' % MAX_BYTES_PER_PATRON)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
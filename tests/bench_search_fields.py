@@ -0,0 +1,54 @@
+"""
+Filename: bench_search_fields.py
+Description: measures payload size and JSON parse time of full search docs against fields/limit projected ones
+
+Run from the repository root with: python -m tests.bench_search_fields
+"""
+
+import json
+import time
+
+import requests
+
+from library.ext_api_interface import Books_API
+from tests.api_stub_server import StubServer
+
+QUERY = 'the'
+PARSES = 200
+
+
+def measure(url):
+    """Downloads a search response and times decoding it.
+
+    :param url: the search URL
+    :returns: a tuple of the body size in bytes and the mean parse time in milliseconds
+    """
+    body = requests.get(url).content
+    start = time.perf_counter()
+    for _ in range(PARSES):
+        json.loads(body)
+    return len(body), (time.perf_counter() - start) * 1000 / PARSES
+
+
+def main():
+    with StubServer() as server:
+        api = Books_API()
+        api.API_URL = server.api_url
+        cases = [
+            ('full docs', '%s?q=%s' % (server.api_url, QUERY)),
+            ('book fields', api.build_url(api.BOOK_FIELDS, q=QUERY)),
+            ('book fields, limit 20', api.build_url(api.BOOK_FIELDS, q=QUERY, limit=20)),
+            ('author fields', api.build_url(api.AUTHOR_FIELDS, q=QUERY)),
+        ]
+        baseline = None
+        for name, url in cases:
+            size, parse_ms = measure(url)
+            if baseline is None:
+                baseline = (size, parse_ms)
+            print('%-22s %9d bytes (%5.1fx smaller)   parse %7.3f ms (%5.1fx faster)' % (
+                name, size, baseline[0] / size, parse_ms, baseline[1] / parse_ms))
+        api.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Filename: bench_serializers.py
+Description: load, dump and round-trip time of the database file for each available serializer
+
+Run from the repository root with: python -m tests.bench_serializers [patrons ...]
+"""
+
+import gc
+import os
+import sys
+import tempfile
+import time
+
+from library import serializers
+from library.serializers import get_serializer
+from library.tinydb_storages import SerializedStorage
+
+SIZES = (10000, 100000, 1000000)
+
+
+def make_database(patrons):
+    """Builds a database like the one TinyDBPatronStore writes.
+
+    :param patrons: the number of patrons
+    :returns: the database as nested dictionaries
+    """
+    table = {}
+    for i in range(patrons):
+        table[str(i + 1)] = {'fname': 'fname', 'lname': 'lname', 'age': 20 + i % 60,
+                             'memberID': 'M%07d' % i,
+                             'borrowed_books': ['book %d' % (i % 97), 'book %d' % (i % 89)][:i % 3]}
+    return {'_default': table}
+
+
+def measure(name, data):
+    """Times writing and reading the database through a SerializedStorage.
+
+    :param name: the serializer name
+    :param data: the database
+    :returns: a tuple of the dump seconds, load seconds and file size in bytes
+    """
+    path = os.path.join(tempfile.mkdtemp(), 'db.json')
+    storage = SerializedStorage(path, serializer=name)
+    gc.collect()
+    start = time.perf_counter()
+    storage.write(data)
+    dump = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded = storage.read()
+    load = time.perf_counter() - start
+    del loaded
+    storage.close()
+    size = os.path.getsize(path)
+    os.remove(path)
+    return dump, load, size
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    sizes = [int(arg) for arg in argv] or SIZES
+    names = [name for name, module in (('json', True), ('orjson', serializers.orjson),
+                                       ('msgpack', serializers.msgpack)) if module]
+    print('default serializer: %s' % get_serializer().name)
+    for patrons in sizes:
+        data = make_database(patrons)
+        print('%d patrons' % patrons)
+        for name in names:
+            dump, load, size = measure(name, data)
+            print('  %-8s dump %8.1f ms   load %8.1f ms   round trip %8.1f ms   %6.1f MB' % (
+                name, dump * 1000, load * 1000, (dump + load) * 1000, size / 1e6))
+
+
+if __name__ == '__main__':
+    main()
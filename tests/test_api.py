@@ -5,6 +5,9 @@ import requests
 import json
 from urllib.parse import urlparse, parse_qs
 import os
+from tests.api_stub_server import StubServer
+import threading
+import time
 
 class TestExtApiInterface(unittest.TestCase):
     def _get_books(self, url: str):
@@ -44,20 +47,104 @@ class TestExtApiInterface(unittest.TestCase):
     def test_make_request_404(self):
         res = requests.Response()
         res.status_code = 404
-        requests.get = Mock(return_value=res)
+        self.api.session.get = Mock(return_value=res)
 
         self.assertIsNone(self.api.make_request('abc'), None)
 
     def test_make_request_error(self):
-        requests.get = Mock(side_effect=requests.ConnectionError)
+        self.api.session.get = Mock(side_effect=requests.ConnectionError)
         self.assertIsNone(self.api.make_request('abc'))
 
+    def test_make_request_timeout(self):
+        self.api.session.get = Mock(side_effect=requests.ReadTimeout)
+        self.assertIsNone(self.api.make_request('abc'))
+
+    def test_make_request_uses_timeouts(self):
+        api = ext_api_interface.Books_API(connect_timeout=1, read_timeout=2)
+        res = requests.Response()
+        res.status_code = 404
+        api.session.get = Mock(return_value=res)
+        api.make_request('abc')
+        api.session.get.assert_called_once_with('abc', timeout=(1, 2))
+
+    def test_session_pool_size(self):
+        api = ext_api_interface.Books_API(pool_size=4)
+        adapter = api.session.get_adapter(api.API_URL)
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    def test_make_request_cached(self):
+        res = requests.Response()
+        res.json = Mock(return_value={'docs': []})
+        res.status_code = 200
+        self.api.session.get = Mock(return_value=res)
+        self.api.make_request(self.api.API_URL + '?q=Learning Python')
+        self.assertEqual(self.api.make_request(self.api.API_URL + '?q=learning python'), {'docs': []})
+        self.api.session.get.assert_called_once()
+        self.assertEqual(self.api.cache.stats()['hits'], 1)
+
+    def test_make_request_negative_result_cached(self):
+        self.api.session.get = Mock(side_effect=requests.ConnectionError)
+        self.assertIsNone(self.api.make_request('abc'))
+        self.assertIsNone(self.api.make_request('abc'))
+        self.api.session.get.assert_called_once()
+
+    def test_make_request_concurrent_misses_single_fetch(self):
+        def slow_fetch(url):
+            time.sleep(0.05)
+            return {'docs': []}
+        self.api.fetch = Mock(side_effect=slow_fetch)
+        threads = [threading.Thread(target=self.api.make_request, args=(self.api.API_URL + '?q=book',))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.api.fetch.assert_called_once()
+
+    def test_search_book_shared_by_accessors(self):
+        self.api.fetch = Mock(return_value={'docs': [{'title': 'book1', 'language': ['eng'], 'ebook_count_i': 2}]})
+        self.assertTrue(self.api.is_book_available('book'))
+        self.assertEqual(self.api.get_book_info('book'), [{'title': 'book1', 'language': ['eng']}])
+        self.assertEqual(self.api.get_ebooks('book'), [{'title': 'book1', 'ebook_count': 2}])
+        self.api.fetch.assert_called_once()
+
+    def test_search_book_none(self):
+        self.api.make_request = Mock(return_value=None)
+        result = self.api.search_book('book')
+        self.assertFalse(result.is_available())
+        self.assertEqual(result.get_book_info(), [])
+        self.assertEqual(result.get_ebooks(), [])
+
+    def test_build_url_fields_and_limit(self):
+        api = ext_api_interface.Books_API(max_results=5)
+        queries = parse_qs(urlparse(api.build_url(('title', 'language'), q='learning python')).query)
+        self.assertEqual(queries, {'q': ['learning python'], 'fields': ['title,language'], 'limit': ['5']})
+
+    def test_search_book_requests_book_fields(self):
+        self.api.make_request = Mock(return_value=None)
+        self.api.search_book('book')
+        queries = parse_qs(urlparse(self.api.make_request.call_args[0][0]).query)
+        self.assertEqual(queries['fields'][0].split(','), list(self.api.BOOK_FIELDS))
+        self.assertEqual(queries['limit'], [str(self.api.MAX_RESULTS)])
+
+    def test_books_by_author_requests_title_suggest(self):
+        self.api.make_request = Mock(return_value=None)
+        self.api.books_by_author('bob')
+        queries = parse_qs(urlparse(self.api.make_request.call_args[0][0]).query)
+        self.assertEqual(queries['author'], ['bob'])
+        self.assertEqual(queries['fields'], ['title_suggest'])
+
+    def test_custom_session(self):
+        session = requests.Session()
+        api = ext_api_interface.Books_API(session=session)
+        self.assertIs(api.session, session)
+
     def test_make_request_valid(self):
         res = requests.Response()
         res.json
         res.json = Mock(return_value={'doc': [{'title': 'book1'}]})
         res.status_code = 200
-        requests.get = Mock(return_value=res)
+        self.api.session.get = Mock(return_value=res)
         self.assertEqual(self.api.make_request('abc'), {'doc': [{'title': 'book1'}]})
         # requests.get = Mock(return_value={'doc': [{'title': 'book1'}]})
 
@@ -132,3 +219,65 @@ class TestExtApiInterface(unittest.TestCase):
     # def test_get_ebooks(self):
     #     self.api.make_request = Mock(return_value=self.json_data)
     #     self.assertEqual(self.api.get_ebooks(self.book), self.books_data)
+
+
+class TestExtApiStreaming(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StubServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.api = ext_api_interface.Books_API()
+        self.api.API_URL = self.server.api_url
+        self.api.STREAM_CHUNK_SIZE = 256
+
+    def tearDown(self):
+        self.api.close()
+
+    def test_stream_ebooks_matches_get_ebooks(self):
+        self.assertEqual(list(self.api.stream_ebooks('the')), self.api.get_ebooks('the'))
+
+    def test_stream_books_by_author_matches_books_by_author(self):
+        self.assertEqual(list(self.api.stream_books_by_author('Tolkien')), self.api.books_by_author('Tolkien'))
+
+    def test_stream_stops_early(self):
+        books = self.api.stream_books_by_author('the')
+        first = next(books)
+        books.close()
+        self.assertEqual(first, self.api.books_by_author('the')[0])
+
+    def test_iter_books_by_author_walks_all_pages(self):
+        api = ext_api_interface.Books_API(max_results=3)
+        api.API_URL = self.server.api_url
+        books = list(api.iter_books_by_author('a', page_size=2))
+        api.close()
+        self.assertEqual(books, self.api.books_by_author('a'))
+        self.assertGreater(len(books), 3)
+
+    def test_iter_books_by_author_prefetch(self):
+        books = list(self.api.iter_books_by_author('a', page_size=2, prefetch=True))
+        self.assertEqual(books, self.api.books_by_author('a'))
+
+    def test_iter_books_by_author_stops_early(self):
+        self.api.cache.clear()
+        before = self.server.request_count
+        books = self.api.iter_books_by_author('a', page_size=2)
+        self.assertEqual(len([next(books) for _ in range(3)]), 3)
+        books.close()
+        self.assertEqual(self.server.request_count - before, 2)
+
+    def test_iter_books_by_author_bad_request(self):
+        self.api.make_request = Mock(return_value=None)
+        self.assertEqual(list(self.api.iter_books_by_author('bob')), [])
+
+    def test_stream_docs_404(self):
+        self.assertEqual(list(self.api.stream_docs(self.server.api_url.replace('search', 'missing'))), [])
+
+    def test_stream_docs_connection_error(self):
+        self.api.session.get = Mock(side_effect=requests.ConnectionError)
+        self.assertEqual(list(self.api.stream_docs('abc')), [])
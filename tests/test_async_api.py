@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+from library.async_api_interface import AsyncBooks_API
+from library.ext_api_interface import Books_API
+from tests.api_stub_server import StubServer
+
+class TestAsyncBooksAPI(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StubServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        api = Books_API()
+        api.API_URL = self.server.api_url
+        self.async_api = AsyncBooks_API(api=api, concurrency=4)
+
+    def tearDown(self):
+        self.async_api.close()
+
+    def test_is_book_available(self):
+        self.assertTrue(asyncio.run(self.async_api.is_book_available('The Lion, the Witch and the Wardrobe')))
+        self.assertFalse(asyncio.run(self.async_api.is_book_available('A very very specific title')))
+
+    def test_books_by_author(self):
+        books = asyncio.run(self.async_api.books_by_author('Tolkien'))
+        self.assertEqual(books, self.async_api.api.books_by_author('Tolkien'))
+
+    def test_get_book_info(self):
+        info = asyncio.run(self.async_api.get_book_info('rings'))
+        self.assertTrue(info)
+        self.assertTrue(all('rings' in book['title'].lower() for book in info))
+
+    def test_get_ebooks(self):
+        ebooks = asyncio.run(self.async_api.get_ebooks('rings'))
+        self.assertEqual(ebooks, self.async_api.api.get_ebooks('rings'))
+
+    def test_gather_keeps_input_order(self):
+        titles = ['rings', 'A very very specific title', 'The Lion, the Witch and the Wardrobe']
+        results = asyncio.run(self.async_api.gather('is_book_available', titles))
+        self.assertEqual(results, [True, False, True])
+
+    def test_gather_unknown_method(self):
+        self.assertRaises(ValueError, asyncio.run, self.async_api.gather('close', ['rings']))
+
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def slow_lookup(book):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return []
+
+        self.async_api.api.get_book_info = Mock(side_effect=slow_lookup)
+        results = asyncio.run(self.async_api.gather('get_book_info', ['t%d' % i for i in range(12)]))
+        self.assertEqual(len(results), 12)
+        self.assertLessEqual(running[1], 4)
+        self.assertGreater(running[1], 1)
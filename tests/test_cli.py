@@ -0,0 +1,125 @@
+import io
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from library import cli
+
+
+class CLITests(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = os.path.join("tests_data", "test_cli_db.json")
+        self.sqlite_path = os.path.join("tests_data", "test_cli_db.sqlite3")
+        self.csv_path = os.path.join("tests_data", "test_cli_patrons.csv")
+        self.jsonl_path = os.path.join("tests_data", "test_cli_patrons.jsonl")
+        with open(self.csv_path, "w", newline="") as f:
+            f.write("memberID,fname,lname,age,borrowed_books\n"
+                    "1,Ada,Lovelace,36,\"[\"\"notes\"\"]\"\n"
+                    "2,Alan,Turing,41,\n"
+                    "3,R2D2,Droid,5,\n"
+                    "1,Ada,Again,36,\n")
+
+    def tearDown(self):
+        for path in (self.db_path, self.csv_path, self.jsonl_path):
+            if os.path.exists(path):
+                os.remove(path)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.sqlite_path + suffix):
+                os.remove(self.sqlite_path + suffix)
+
+    def _run(self, *argv):
+        stderr = io.StringIO()
+        with patch('sys.stderr', stderr):
+            cli.main(list(argv))
+        return stderr.getvalue()
+
+    def test_import_csv(self):
+        output = self._run("import", self.csv_path, "--db", self.db_path, "--chunk-size", "2")
+        self.assertIn("2 inserted, 1 skipped, 1 invalid", output)
+        self.assertIn("rows/s", output)
+        db = cli.open_db(self.db_path)
+        ada = db.retrieve_patron("1")
+        count = db.get_patron_count()
+        records = db.get_all_patrons()
+        db.close_db()
+        self.assertEqual(count, 2)
+        self.assertEqual(ada.get_lname(), "Lovelace")
+        self.assertEqual(records[0]["age"], 36)
+        self.assertEqual(records[0]["borrowed_books"], ["notes"])
+
+    def test_export_jsonl_round_trip_through_sqlite(self):
+        self._run("import", self.csv_path, "--db", self.sqlite_path, "--quiet")
+        output = self._run("export", self.jsonl_path, "--db", self.sqlite_path, "--chunk-size", "1")
+        self.assertIn("2 exported", output)
+        with open(self.jsonl_path) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(rows, [
+            {"memberID": "1", "fname": "Ada", "lname": "Lovelace", "age": 36, "borrowed_books": ["notes"]},
+            {"memberID": "2", "fname": "Alan", "lname": "Turing", "age": 41, "borrowed_books": []}])
+
+        os.remove(self.csv_path)
+        self._run("export", self.csv_path, "--db", self.sqlite_path, "--quiet")
+        self._run("import", self.csv_path, "--db", self.db_path, "--quiet")
+        db = cli.open_db(self.db_path)
+        records = db.get_all_patrons()
+        db.close_db()
+        self.assertEqual(records, rows)
+
+    def test_import_jsonl_skips_blank_lines(self):
+        with open(self.jsonl_path, "w") as f:
+            f.write('{"memberID": 7, "fname": "Grace", "lname": "Hopper", "age": 85}\n\n')
+        self.assertIn("1 inserted", self._run("import", self.jsonl_path, "--db", self.db_path))
+
+    def test_import_csv_skips_short_rows(self):
+        with open(self.csv_path, "a", newline="") as f:
+            f.write("4,Grace\n"
+                    "5,Edsger,Dijkstra\n"
+                    "6,Barbara,Liskov,86,[not json\n"
+                    "7,Donald,Knuth,88,\n"
+                    "8,Frances,Allen,,\n"
+                    "9,Radia,Perlman,abc,\n"
+                    "10,Margaret,Hamilton,-3,\n"
+                    "11,Niklaus,Wirth,89,\"\"\"dune\"\"\"\n")
+        output = self._run("import", self.csv_path, "--db", self.db_path, "--chunk-size", "2")
+        self.assertIn("3 inserted, 1 skipped, 8 invalid", output)
+        self.assertIn("line 4 skipped: Name should not contain numbers", output)
+        self.assertIn("line 6 skipped: lname is missing", output)
+        self.assertIn("line 7 skipped: age is missing", output)
+        self.assertIn("line 8 skipped: not a patron record", output)
+        self.assertIn("line 10 skipped: age is missing", output)
+        self.assertIn("line 11 skipped: age 'abc' is not a whole number", output)
+        self.assertIn("line 12 skipped: age '-3' is not a whole number", output)
+        self.assertIn("line 13 skipped: borrowed_books is not a list", output)
+
+    def test_import_jsonl_skips_malformed_lines(self):
+        with open(self.jsonl_path, "w") as f:
+            f.write('{"memberID": 7, "fname": "Grace", "lname": "Hopper", "age": 85}\n'
+                    '{"memberID": 8, "fname": "Alan", "age": 41}\n'
+                    '{"memberID": 9, "fname": "Ada", "lname": null, "age": 36}\n'
+                    '{"memberID": 10, "fname": "Edsger", "lname": "Dijkstra", "age": 72, "borrowed_books": 3}\n'
+                    '{"memberID": 11, \n'
+                    '["not", "a", "record"]\n'
+                    '{"memberID": 12, "fname": "Barbara", "lname": "Liskov", "age": 86}\n')
+        output = self._run("import", self.jsonl_path, "--db", self.db_path, "--chunk-size", "2")
+        self.assertIn("2 inserted, 0 skipped, 5 invalid", output)
+        for line_num in range(2, 7):
+            self.assertIn("line %d skipped" % line_num, output)
+
+    def test_unknown_format(self):
+        with self.assertRaises(SystemExit):
+            self._run("import", "patrons.txt", "--db", self.db_path)
+
+    def test_import_patrons_is_lazy(self):
+        def rows():
+            yield 2, {"memberID": "1", "fname": "Ada", "lname": "Lovelace", "age": 36}
+            raise AssertionError("read past the first chunk")
+
+        db = cli.open_db(self.db_path)
+        chunks = []
+        db.insert_patrons = lambda patrons: chunks.append(patrons) or {"inserted": [], "skipped": []}
+        with self.assertRaises(AssertionError):
+            cli.import_patrons(db, rows(), chunk_size=1)
+        db.close_db()
+        self.assertEqual(len(chunks), 1)
@@ -0,0 +1,262 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from library import locks
+from library.library import Library
+from library.library_db_interface import Library_DB
+from library.patron import Patron
+from library.patron_store import TinyDBPatronStore
+from library.sqlite_patron_store import SQLitePatronStore
+
+
+class ConcurrentCheckoutTests(unittest.TestCase):
+    """Many threads borrowing and returning against one database file."""
+
+    THREADS = 12
+    CHECKOUTS = 25
+
+    def setUp(self):
+        self.db_path = os.path.join("tests_data", "test_concurrency_db.json")
+        self._remove_files()
+        self._switch_interval = sys.getswitchinterval()
+        # switch threads often so unguarded read-modify-writes would interleave
+        sys.setswitchinterval(1e-5)
+
+    def tearDown(self):
+        sys.setswitchinterval(self._switch_interval)
+        self._remove_files()
+
+    def _remove_files(self):
+        for suffix in ('', '.log', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def _open_db(self, **kwargs):
+        return Library_DB(store=TinyDBPatronStore(self.db_path, **kwargs))
+
+    def _run_threads(self, target):
+        errors = []
+
+        def run(n):
+            try:
+                target(n)
+            except Exception as e: # reported by the main thread
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def _stress(self, db):
+        library = Library(db=db, api=object())
+        db.insert_patron(Patron("shared", "patron", 30, "S"))
+        for n in range(self.THREADS):
+            db.insert_patron(Patron("own", "patron", 30, "P%d" % n))
+
+        def work(n):
+            own = db.retrieve_patron("P%d" % n)
+            for i in range(self.CHECKOUTS):
+                # every thread works on its own, soon stale, copy of the shared patron
+                shared = db.retrieve_patron("S")
+                library.borrow_book("book %d-%d" % (n, i), shared)
+                library.borrow_book("book %d" % i, own)
+                if i % 5 == 4:
+                    library.return_borrowed_book("book %d" % (i - 1), own)
+                db.get_borrowers("book %d-%d" % (n, i))
+                db.get_patron_count()
+
+        self._run_threads(work)
+        db.close_db()
+
+    def _check(self, db):
+        shared = db.retrieve_patron("S")
+        expected = set("book %d-%d" % (n, i) for n in range(self.THREADS) for i in range(self.CHECKOUTS))
+        self.assertEqual(set(shared.get_borrowed_books()), expected)
+        own_expected = set("book %d" % i for i in range(self.CHECKOUTS) if i % 5 != 3)
+        for n in range(self.THREADS):
+            self.assertEqual(set(db.retrieve_patron("P%d" % n).get_borrowed_books()), own_expected)
+        self.assertEqual(db.count_borrowers("book 0-0"), 1)
+        self.assertEqual(db.count_borrowers("book 0"), self.THREADS)
+        self.assertEqual(db.get_patron_count(), self.THREADS + 1)
+        db.close_db()
+
+    def test_no_lost_updates(self):
+        self._stress(self._open_db())
+        self._check(self._open_db())
+
+    def test_no_lost_updates_group_commit(self):
+        # the timer thread flushes while checkouts keep changing the data
+        self._stress(self._open_db(write_cache_size=10 ** 9, flush_interval=0.001))
+        self._check(self._open_db())
+
+    def test_no_lost_updates_sqlite(self):
+        self._stress(Library_DB(store=SQLitePatronStore(self.db_path)))
+        self._check(Library_DB(store=SQLitePatronStore(self.db_path)))
+
+    def test_concurrent_inserts_of_one_member(self):
+        db = self._open_db()
+
+        def insert(n):
+            db.insert_patron(Patron("fname", "lname", 30, "SAME"))
+            db.insert_patrons([Patron("fname", "lname", 30, "BULK%d" % i) for i in range(5)])
+
+        self._run_threads(insert)
+        self.assertEqual(db.get_patron_count(), 6)
+        self.assertEqual(len(db.get_all_patrons()), 6)
+        db.close_db()
+
+
+def _checkout_worker(db_path, worker, checkouts):
+    """Borrows books for the shared patron from a separate process."""
+    db = Library_DB(store=TinyDBPatronStore(db_path, multiprocess=True))
+    library = Library(db=db, api=object())
+    for i in range(checkouts):
+        library.borrow_book("book %d-%d" % (worker, i), db.retrieve_patron("S"))
+    db.close_db()
+
+
+@unittest.skipIf(locks.fcntl is None, "fcntl is not available")
+class MultiProcessTests(unittest.TestCase):
+    """Several TinyDBPatronStore instances sharing one file in multiprocess mode."""
+
+    def setUp(self):
+        self.db_path = os.path.join("tests_data", "test_multiprocess_db.json")
+        self._remove_files()
+        self.first = TinyDBPatronStore(self.db_path, multiprocess=True)
+        self.second = TinyDBPatronStore(self.db_path, multiprocess=True)
+
+    def tearDown(self):
+        self.first.close()
+        self.second.close()
+        self._remove_files()
+
+    def _remove_files(self):
+        for suffix in ('', '.lock'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def _record(self, memberID, books=None):
+        return {'fname': 'fname', 'lname': 'lname', 'age': 30, 'memberID': memberID,
+                'borrowed_books': books or []}
+
+    def test_sees_other_writes(self):
+        self.first.insert(self._record('A1', ['dune']))
+        self.assertTrue(self.second.contains('A1'))
+        self.assertEqual(self.second.get('A1')['borrowed_books'], ['dune'])
+        self.assertEqual(self.second.get_borrowers('dune'), {'A1'})
+        self.first.delete('A1')
+        self.assertEqual(self.second.count(), 0)
+
+    def test_document_ids_do_not_collide(self):
+        self.first.insert(self._record('A1'))
+        self.second.insert(self._record('B1'))
+        self.first.insert(self._record('A2'))
+        self.assertEqual(sorted(r['memberID'] for r in self.second.all()), ['A1', 'A2', 'B1'])
+        self.assertEqual(sorted(r['memberID'] for r in self.first.all()), ['A1', 'A2', 'B1'])
+
+    def test_reloads_only_after_a_change(self):
+        self.first.insert(self._record('A1'))
+        self.second.get('A1')
+        with patch.object(self.second, 'build_index', wraps=self.second.build_index) as build_index:
+            for _ in range(5):
+                self.second.get('A1')
+                self.second.count()
+            self.assertEqual(build_index.call_count, 0)
+            self.first.update('A1', self._record('A1', ['emma']))
+            self.assertEqual(self.second.get('A1')['borrowed_books'], ['emma'])
+            self.second.get('A1')
+            self.assertEqual(build_index.call_count, 1)
+
+    def test_own_writes_need_no_reload(self):
+        with patch.object(self.first, 'build_index', wraps=self.first.build_index) as build_index:
+            self.first.insert(self._record('A1'))
+            self.first.update('A1', self._record('A1', ['emma']))
+            self.first.get('A1')
+            self.assertEqual(build_index.call_count, 0)
+
+    def test_batch_is_one_commit(self):
+        generation = self.first.process_lock.generation()
+        with self.first.batch():
+            for i in range(5):
+                self.first.insert(self._record('A%d' % i))
+        self.assertEqual(self.first.process_lock.generation(), generation + 1)
+        self.assertEqual(self.second.count(), 5)
+
+    def test_lockless_reads_during_reload(self):
+        with self.first.batch():
+            for i in range(2000):
+                self.first.insert(self._record('M%d' % i))
+        self.second.count()
+        seen = []
+        stop = threading.Event()
+
+        def read():
+            while not stop.is_set():
+                seen.append((self.second.count(), self.second.contains('M1999')))
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            # as when a write through second rereads the file first changed
+            for _ in range(20):
+                self.second.build_index()
+        finally:
+            stop.set()
+            reader.join()
+            sys.setswitchinterval(switch_interval)
+        self.assertEqual(set(seen), {(2000, True)})
+
+    def test_batch_beside_checkout(self):
+        db = Library_DB(store=self.first)
+        library = Library(db=db, api=object())
+        db.insert_patron(Patron("shared", "patron", 30, "S"))
+        retrieved = threading.Event()
+        in_batch = threading.Event()
+
+        def batch():
+            retrieved.wait()
+            with db.batch():
+                in_batch.set()
+                # give the other thread time to start its checkout
+                time.sleep(0.2)
+                library.borrow_book("dune", db.retrieve_patron("S"))
+
+        def checkout():
+            patron = db.retrieve_patron("S")
+            retrieved.set()
+            in_batch.wait()
+            library.borrow_book("emma", patron)
+
+        threads = [threading.Thread(target=checkout, daemon=True), threading.Thread(target=batch, daemon=True)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+            self.assertFalse(thread.is_alive(), "deadlocked")
+        self.assertEqual(set(db.retrieve_patron("S").get_borrowed_books()), {"dune", "emma"})
+
+    def test_group_commit_refused(self):
+        self.assertRaises(ValueError, TinyDBPatronStore, self.db_path, multiprocess=True, write_cache_size=10)
+
+    def test_checkouts_from_many_processes(self):
+        db = Library_DB(store=self.first)
+        db.insert_patron(Patron("shared", "patron", 30, "S"))
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=_checkout_worker, args=(self.db_path, n, 15)) for n in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+            self.assertEqual(worker.exitcode, 0)
+        expected = set("book %d-%d" % (n, i) for n in range(4) for i in range(15))
+        self.assertEqual(set(db.retrieve_patron("S").get_borrowed_books()), expected)
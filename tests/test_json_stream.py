@@ -0,0 +1,63 @@
+import json
+import unittest
+from library.json_stream import iter_array_items
+
+class TestJsonStream(unittest.TestCase):
+
+    def setUp(self):
+        with open('tests_data/api_data.json') as file:
+            self.body = file.read()
+        self.docs = json.loads(self.body)['docs']
+
+    def _chunks(self, text, size):
+        data = text.encode('utf-8')
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_whole_document(self):
+        self.assertEqual(list(iter_array_items([self.body], 'docs')), self.docs)
+
+    def test_small_chunks(self):
+        for size in (13, 4096):
+            self.assertEqual(list(iter_array_items(self._chunks(self.body, size), 'docs')), self.docs)
+
+    def test_number_split_across_chunks(self):
+        items = iter_array_items(['{"docs": [12', '34, 5', '6]}'], 'docs')
+        self.assertEqual(list(items), [1234, 56])
+
+    def test_number_split_after_decimal_point(self):
+        self.assertEqual(list(iter_array_items([b'{"docs": [1.', b'5]}'], 'docs')), [1.5])
+
+    def test_number_split_after_exponent(self):
+        self.assertEqual(list(iter_array_items([b'{"docs": [2e', b'3]}'], 'docs')), [2000.0])
+        self.assertEqual(list(iter_array_items([b'{"docs": [2e-', b'3]}'], 'docs')), [0.002])
+
+    def test_skipped_float_split_across_chunks(self):
+        items = iter_array_items([b'{"score": 0.', b'75, "docs": [1]}'], 'docs')
+        self.assertEqual(list(items), [1])
+
+    def test_multibyte_split_across_chunks(self):
+        body = json.dumps({'docs': ['Voyage au Centre de la Terre éè'], 'q': 'x'}, ensure_ascii=False)
+        self.assertEqual(list(iter_array_items(self._chunks(body, 1), 'docs')),
+                         ['Voyage au Centre de la Terre éè'])
+
+    def test_skips_other_keys(self):
+        body = '{"q": "\\"docs\\": [1]", "nested": {"docs": [2]}, "docs": [3, 4], "after": 1}'
+        self.assertEqual(list(iter_array_items(self._chunks(body, 3), 'docs')), [3, 4])
+
+    def test_missing_key(self):
+        self.assertEqual(list(iter_array_items(['{"numFound": 0}'], 'docs')), [])
+        self.assertEqual(list(iter_array_items(['{}'], 'docs')), [])
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_array_items(['{"docs": [ ]}'], 'docs')), [])
+
+    def test_stops_early_without_reading_rest(self):
+        chunks = iter(['{"docs": [1, ', '2, ', '3]}'])
+        items = iter_array_items(chunks, 'docs')
+        self.assertEqual(next(items), 1)
+        self.assertEqual(next(chunks), '2, ')
+
+    def test_malformed(self):
+        self.assertRaises(ValueError, list, iter_array_items(['{"docs": [1 2]}'], 'docs'))
+        self.assertRaises(ValueError, list, iter_array_items(['{"docs": [1, '], 'docs'))
+        self.assertRaises(ValueError, list, iter_array_items(['[1, 2]'], 'docs'))
@@ -13,6 +13,13 @@ class TestLibrary(unittest.TestCase):
         with open('tests_data/book_data.txt', 'r') as f:
             self.book_data = json.loads(f.read())
 
+    def test_injected_db_and_api(self):
+        db = Mock()
+        api = Mock()
+        lib = library.Library(db=db, api=api)
+        self.assertIs(lib.db, db)
+        self.assertIs(lib.api, api)
+
     def test_is_ebook_true(self):
         self.lib.api.get_ebooks = Mock(return_value=self.ebooks_data)
         tst_value = "learning python"
@@ -93,6 +100,59 @@ class TestLibrary(unittest.TestCase):
         self.lib.api.get_book_info.assert_called_once_with(tst_value_book)
         self.assertSetEqual(actual, expected)
     
+    def test_projections_from_search_result(self):
+        result = Mock()
+        result.get_ebooks.return_value = self.ebooks_data
+        result.get_book_info.return_value = self.book_data
+        self.lib.api.get_ebooks = Mock()
+        self.lib.api.get_book_info = Mock()
+
+        self.assertTrue(self.lib.is_ebook("learning python", result))
+        self.assertEqual(self.lib.get_ebooks_count("learning python", result), 8)
+        self.assertSetEqual(self.lib.get_languages_for_book("Way of Kings", result),
+                            set(["por", "pol", "ger", "eng", "spa", "tst"]))
+
+        self.lib.api.get_ebooks.assert_not_called()
+        self.lib.api.get_book_info.assert_not_called()
+
+    def test_get_ebooks_counts_dedupes_titles(self):
+        self.lib.api.get_ebooks = Mock(return_value=self.ebooks_data)
+        titles = ["Learning Python", "learning python", "Way of Kings"]
+
+        actual = self.lib.get_ebooks_counts(titles)
+
+        self.assertEqual(actual, {"Learning Python": 8, "learning python": 8, "Way of Kings": 8})
+        self.assertEqual(self.lib.api.get_ebooks.call_count, 2)
+
+    def test_get_languages_for_books(self):
+        self.lib.api.get_book_info = Mock(return_value=self.book_data)
+
+        actual = self.lib.get_languages_for_books(["Way of Kings"])
+
+        self.assertSetEqual(actual["Way of Kings"], set(["por", "pol", "ger", "eng", "spa", "tst"]))
+
+    def test_are_ebooks(self):
+        self.lib.api.get_ebooks = Mock(return_value=self.ebooks_data)
+
+        actual = self.lib.are_ebooks(["learning python", "eating python"])
+
+        self.assertEqual(actual, {"learning python": True, "eating python": False})
+
+    def test_batch_reports_failures_per_title(self):
+        def get_ebooks(book):
+            if book == "bad":
+                raise KeyError("ebook_count_i")
+            return self.ebooks_data
+        self.lib.api.get_ebooks = Mock(side_effect=get_ebooks)
+
+        actual = self.lib.get_ebooks_counts(["learning python", "bad"])
+
+        self.assertEqual(actual["learning python"], 8)
+        self.assertIsInstance(actual["bad"], KeyError)
+
+    def test_batch_empty(self):
+        self.assertEqual(self.lib.get_ebooks_counts([]), {})
+
     @patch('library.patron.Patron', new=lambda:"")
     def test_register_patron(self):
         tst_value_fname = "fname"
@@ -107,6 +167,24 @@ class TestLibrary(unittest.TestCase):
         self.lib.db.insert_patron.assert_called_once()
         self.assertEqual(actual, expected)
         
+    def test_register_patrons(self):
+        self.lib.db.insert_patrons = Mock(return_value={"inserted": ["1", "2"], "skipped": []})
+
+        actual = self.lib.register_patrons([("fname", "lname", 20, "1"), ("other", "name", 30, "2")])
+
+        patrons = self.lib.db.insert_patrons.call_args[0][0]
+        self.assertEqual([p.get_memberID() for p in patrons], ["1", "2"])
+        self.assertEqual(actual, {"inserted": ["1", "2"], "skipped": []})
+
+    def test_register_patrons_invalid_name_writes_nothing(self):
+        self.lib.db.insert_patrons = Mock()
+
+        with self.assertRaises(patron.InvalidNameException) as context:
+            self.lib.register_patrons([("fname", "lname", 20, "1"), ("f1name", "lname", 20, "2")])
+
+        self.assertIn("2", str(context.exception))
+        self.lib.db.insert_patrons.assert_not_called()
+
     @patch('library.patron.Patron')
     def test_is_patron_registered_true(self, mock_Patron):
         tst_value_memberID = "memberID"
@@ -150,6 +228,22 @@ class TestLibrary(unittest.TestCase):
         mock_Patron.return_borrowed_book.assert_called_once_with("way of kings")
         self.lib.db.update_patron.assert_called_once_with(mock_Patron)
     
+    def test_get_borrowers(self):
+        self.lib.db.get_borrowers = Mock(return_value={"1", "2"})
+
+        actual = self.lib.get_borrowers("Way of Kings")
+
+        self.lib.db.get_borrowers.assert_called_once_with("Way of Kings")
+        self.assertEqual(actual, {"1", "2"})
+
+    def test_count_copies_out(self):
+        self.lib.db.count_borrowers = Mock(return_value=2)
+
+        actual = self.lib.count_copies_out("Way of Kings")
+
+        self.lib.db.count_borrowers.assert_called_once_with("Way of Kings")
+        self.assertEqual(actual, 2)
+
     @patch('library.patron.Patron')
     def test_is_book_borrowed_true(self, mock_Patron):
         tst_value_book_name = "Way of Kings"
@@ -32,6 +32,11 @@ class DummyPatron:
     def get_borrowed_books(self):
         return self._borrowed_books
 
+    @classmethod
+    def from_db(cls, record):
+        return cls(record["fname"], record["lname"], record["age"], record["memberID"],
+                   list(record.get("borrowed_books", [])))
+
 
 class LibraryDBTests(unittest.TestCase):
     def setUp(self):
@@ -50,7 +55,7 @@ class LibraryDBTests(unittest.TestCase):
         self._patron_patch.start()
 
         # Create fresh DB instance per test
-        self.db = ldi.Library_DB()
+        self.db = self._open_db()
 
     def tearDown(self):
         # Close and clean up
@@ -64,6 +69,9 @@ class LibraryDBTests(unittest.TestCase):
 
     # ---------- helpers ----------
 
+    def _open_db(self):
+        return ldi.Library_DB()
+
     def _make_patron(self, memberID="P001", fname="Test", lname="Person",
                      age=36, borrowed=None):
         return DummyPatron(fname, lname, age, memberID, borrowed)
@@ -147,7 +155,7 @@ class LibraryDBTests(unittest.TestCase):
         self.assertEqual(got.get_lname(), "Turing")
         self.assertEqual(got.get_age(), 41)
         self.assertEqual(got.get_memberID(), "R42")
-        self.assertEqual(got.get_borrowed_books(), [])
+        self.assertEqual(got.get_borrowed_books(), ["The Imitation Game"])
 
     def test_retrieve_patron_nonexistent_returns_none(self):
         self.assertIsNone(self.db.retrieve_patron("NOPE"))
@@ -178,8 +186,130 @@ class LibraryDBTests(unittest.TestCase):
         # Should not raise
         self.db.close_db()
         # Re-open a new instance against same file: data persists to disk
-        db2 = ldi.Library_DB()
+        db2 = self._open_db()
         count = db2.get_patron_count()
         db2.close_db()
         self.assertEqual(count, 1)
 
+    def test_delete_patron_removes_record_and_frees_memberID(self):
+        self.db.insert_patron(self._make_patron(memberID="D1"))
+        self.assertTrue(self.db.delete_patron("D1"))
+        self.assertIsNone(self.db.retrieve_patron("D1"))
+        self.assertEqual(self.db.get_patron_count(), 0)
+        # memberID can be registered again once deleted
+        self.assertIsNotNone(self.db.insert_patron(self._make_patron(memberID="D1")))
+
+    def test_delete_patron_nonexistent_returns_false(self):
+        self.assertFalse(self.db.delete_patron("NOPE"))
+
+    def test_update_patron_nonexistent_does_not_insert(self):
+        self.db.update_patron(self._make_patron(memberID="GHOST"))
+        self.assertEqual(self.db.get_patron_count(), 0)
+
+    def test_index_is_rebuilt_on_open(self):
+        self.db.insert_patron(self._make_patron(memberID="I1", fname="First"))
+        self.db.insert_patron(self._make_patron(memberID="I2", fname="Second"))
+        self.db.close_db()
+        self.db = self._open_db()
+        self.assertEqual(self.db.retrieve_patron("I2").get_fname(), "Second")
+        self.assertIsNone(self.db.insert_patron(self._make_patron(memberID="I1")))
+
+    def test_batch_writes_visible_and_persisted(self):
+        with self.db.batch():
+            self.db.insert_patron(self._make_patron(memberID="B1"))
+            self.db.insert_patron(self._make_patron(memberID="B2"))
+            self.db.update_patron(self._make_patron(memberID="B1", borrowed=["book1"]))
+            self.assertEqual(self.db.get_patron_count(), 2)
+        self.db.close_db()
+        self.db = self._open_db()
+        self.assertEqual(self.db.get_patron_count(), 2)
+        self.assertEqual(self.db.get_all_patrons()[0]["borrowed_books"], ["book1"])
+
+    def test_batch_nested_and_exception_keeps_writes(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.batch():
+                with self.db.batch():
+                    self.db.insert_patron(self._make_patron(memberID="B1"))
+                raise RuntimeError("boom")
+        self.db.close_db()
+        self.db = self._open_db()
+        self.assertEqual(self.db.get_patron_count(), 1)
+
+    def test_stored_record_not_aliased_to_patron_or_caller(self):
+        p = self._make_patron(memberID="AL1", borrowed=["book1"])
+        self.db.insert_patron(p)
+        p.get_borrowed_books().append("book2")
+        self.db.get_all_patrons()[0]["borrowed_books"].append("book3")
+        self.assertEqual(self.db.get_all_patrons()[0]["borrowed_books"], ["book1"])
+
+    def test_insert_patrons_skips_existing_and_repeated(self):
+        self.db.insert_patron(self._make_patron(memberID="E1"))
+        result = self.db.insert_patrons([
+            self._make_patron(memberID="N1"),
+            self._make_patron(memberID="E1"),
+            None,
+            self._make_patron(memberID="N2", borrowed=["book1"]),
+            self._make_patron(memberID="N1", fname="Dup"),
+        ])
+        self.assertEqual(result, {"inserted": ["N1", "N2"], "skipped": ["E1", "N1"]})
+        self.assertEqual(self.db.get_patron_count(), 3)
+        self.assertEqual(self.db.retrieve_patron("N1").get_fname(), "Test")
+        self.db.close_db()
+        self.db = self._open_db()
+        self.assertEqual(self.db.get_patron_count(), 3)
+
+    def test_insert_patrons_empty(self):
+        self.assertEqual(self.db.insert_patrons([]), {"inserted": [], "skipped": []})
+
+
+    def test_iter_patron_records_matches_get_all_patrons(self):
+        self.db.insert_patrons([self._make_patron(memberID="IT%d" % i, borrowed=["b%d" % i])
+                                for i in range(5)])
+        records = self.db.iter_patron_records(batch_size=2)
+        self.assertNotIsInstance(records, list)
+        self.assertEqual(list(records), self.db.get_all_patrons())
+
+    def test_iter_patrons_yields_patron_objects(self):
+        self.db.insert_patrons([self._make_patron(memberID="P%d" % i, fname="Name%d" % i) for i in range(3)])
+        patrons = self.db.iter_patrons(batch_size=2)
+        self.assertNotIsInstance(patrons, list)
+        patrons = list(patrons)
+        self.assertTrue(all(isinstance(p, DummyPatron) for p in patrons))
+        self.assertEqual([p.get_memberID() for p in patrons], ["P0", "P1", "P2"])
+        self.assertEqual(patrons[2].get_fname(), "Name2")
+
+    def test_get_patron_count_after_delete(self):
+        self.db.insert_patrons([self._make_patron(memberID="C1"), self._make_patron(memberID="C2")])
+        self.db.delete_patron("C1")
+        self.assertEqual(self.db.get_patron_count(), 1)
+
+    def test_borrowers_index_follows_updates_and_deletes(self):
+        self.db.insert_patron(self._make_patron(memberID="R1", borrowed=["dune"]))
+        self.db.insert_patrons([self._make_patron(memberID="R2", borrowed=["dune", "emma"]),
+                                self._make_patron(memberID="R3")])
+        self.assertEqual(self.db.get_borrowers("Dune"), {"R1", "R2"})
+        self.assertEqual(self.db.count_borrowers("dune"), 2)
+
+        self.db.update_patron(self._make_patron(memberID="R1", borrowed=["emma"]))
+        self.db.update_patron(self._make_patron(memberID="R3", borrowed=["dune"]))
+        self.assertEqual(self.db.get_borrowers("dune"), {"R2", "R3"})
+        self.assertEqual(self.db.get_borrowers("emma"), {"R1", "R2"})
+
+        self.db.delete_patron("R2")
+        self.assertEqual(self.db.get_borrowers("dune"), {"R3"})
+        self.assertEqual(self.db.count_borrowers("emma"), 1)
+        self.assertEqual(self.db.get_borrowers("nothing"), set())
+        self.assertEqual(self.db.count_borrowers("nothing"), 0)
+
+    def test_borrowers_index_rebuilt_on_open(self):
+        self.db.insert_patron(self._make_patron(memberID="R1", borrowed=["dune"]))
+        self.db.close_db()
+        self.db = self._open_db()
+        self.assertEqual(self.db.get_borrowers("dune"), {"R1"})
+
+    def test_convert_patron_with_borrowed_books_container(self):
+        from library.patron import BorrowedBooks
+        p = self._make_patron(memberID="S1", borrowed=BorrowedBooks(["b1", "b2"]))
+        data = self.db.convert_patron_to_db_format(p)
+        self.assertIs(type(data["borrowed_books"]), list)
+        self.assertEqual(data["borrowed_books"], ["b1", "b2"])
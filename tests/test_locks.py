@@ -0,0 +1,111 @@
+import threading
+import time
+import unittest
+
+from library.locks import ReadWriteLock, StripedLock
+
+
+class ReadWriteLockTests(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def _in_thread(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+
+    def test_readers_share(self):
+        inside = threading.Barrier(2, timeout=5)
+
+        def reader():
+            with self.lock.read_lock():
+                inside.wait()
+
+        thread = self._in_thread(reader)
+        with self.lock.read_lock():
+            inside.wait()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_writer_excludes_readers(self):
+        events = []
+        self.lock.acquire_write()
+
+        def reader():
+            with self.lock.read_lock():
+                events.append("read")
+
+        thread = self._in_thread(reader)
+        time.sleep(0.05)
+        events.append("write done")
+        self.lock.release_write()
+        thread.join(5)
+        self.assertEqual(events, ["write done", "read"])
+
+    def test_waiting_writer_blocks_new_readers(self):
+        events = []
+        self.lock.acquire_read()
+        writer = self._in_thread(lambda: self._write(events))
+        time.sleep(0.05)
+
+        def reader():
+            with self.lock.read_lock():
+                events.append("read")
+
+        late_reader = self._in_thread(reader)
+        time.sleep(0.05)
+        self.assertEqual(events, [])
+        self.lock.release_read()
+        writer.join(5)
+        late_reader.join(5)
+        self.assertEqual(events, ["write", "read"])
+
+    def _write(self, events):
+        with self.lock.write_lock():
+            events.append("write")
+
+    def test_reentrant(self):
+        with self.lock.write_lock():
+            with self.lock.write_lock():
+                with self.lock.read_lock():
+                    pass
+        with self.lock.read_lock():
+            with self.lock.read_lock():
+                pass
+        # fully released: another thread can write
+        thread = self._in_thread(lambda: self._write([]))
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_write_released_before_nested_read(self):
+        self.lock.acquire_write()
+        self.lock.acquire_read()
+        self.lock.release_write()
+        self.lock.release_read()
+        thread = self._in_thread(lambda: self._write([]))
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_upgrade_refused(self):
+        with self.lock.read_lock():
+            self.assertRaises(RuntimeError, self.lock.acquire_write)
+
+
+class StripedLockTests(unittest.TestCase):
+
+    def test_same_key_same_lock(self):
+        locks = StripedLock(8)
+        self.assertEqual(len(locks), 8)
+        self.assertIs(locks.for_key("M1"), locks.for_key("M1"))
+
+    def test_all(self):
+        locks = StripedLock(4)
+        acquired = []
+        with locks.all():
+            thread = threading.Thread(target=lambda: acquired.append(locks.for_key("M1").acquire(timeout=0.05)))
+            thread.start()
+            thread.join()
+        self.assertEqual(acquired, [False])
+        self.assertTrue(locks.for_key("M1").acquire(timeout=1))
+        locks.for_key("M1").release()
@@ -134,4 +134,69 @@ class TestPatron(unittest.TestCase):
     def test_eq_memberID(self):
         pat1 = patron.Patron('fname', 'lname', '20', '1234')
         pat2 = patron.Patron('fnamee', 'lname', '20', '12344')
-        self.assertFalse(pat1 == pat2)
\ No newline at end of file
+        self.assertFalse(pat1 == pat2)
+
+    def test_borrowed_books_membership(self):
+        self.pat.add_borrowed_book("TestBook")
+        self.assertIn("testbook", self.pat.get_borrowed_books())
+        self.assertNotIn("otherbook", self.pat.get_borrowed_books())
+
+    def test_borrowed_books_keep_order_after_readd(self):
+        self.pat.add_borrowed_book("testbook1")
+        self.pat.add_borrowed_book("testbook2")
+        self.pat.add_borrowed_book("testbook1")
+        self.assertEqual(list(self.pat.get_borrowed_books()), ["testbook1", "testbook2"])
+        self.assertEqual(self.pat.get_borrowed_books()[1], "testbook2")
+
+    def test_borrowed_books_equality(self):
+        books = patron.BorrowedBooks(["a", "b"])
+        self.assertEqual(books, ["a", "b"])
+        self.assertNotEqual(books, ["b", "a"])
+        self.assertEqual(books, patron.BorrowedBooks(["a", "b"]))
+        self.assertNotEqual(books, "ab")
+
+    def test_eq_borrowed_books(self):
+        pat1 = patron.Patron('fname', 'lname', '20', '1234')
+        pat2 = patron.Patron('fname', 'lname', '20', '1234')
+        pat1.add_borrowed_book("testbook")
+        self.assertFalse(pat1 == pat2)
+        pat2.add_borrowed_book("testbook")
+        self.assertTrue(pat1 == pat2)
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(self.pat, '__dict__'))
+        with self.assertRaises(AttributeError):
+            self.pat.nickname = 'nick'
+
+    def test_eq_other_type(self):
+        self.assertFalse(self.pat == 'fname lname')
+        self.assertTrue(self.pat != 'fname lname')
+
+    def test_hash_memberID(self):
+        pat1 = patron.Patron('fname', 'lname', '20', '1234')
+        pat2 = patron.Patron('fname', 'lname', '20', '1234')
+        self.assertEqual(hash(pat1), hash(pat2))
+        self.assertEqual(len({pat1, pat2}), 1)
+
+    def test_invalid_name_unicode_digit(self):
+        self.assertRaises(patron.InvalidNameException, patron.Patron, 'fname\u0663', 'lname', '20', '1234')
+
+    def test_from_db(self):
+        self.pat.add_borrowed_book("testbook")
+        record = {'fname': 'fname', 'lname': 'lname', 'age': '20', 'memberID': '1234',
+                  'borrowed_books': ['testbook']}
+        pat = patron.Patron.from_db(record)
+        self.assertEqual(pat, self.pat)
+        self.assertIn("testbook", pat.get_borrowed_books())
+
+    def test_from_db_copies_borrowed_books(self):
+        record = {'fname': 'fname', 'lname': 'lname', 'age': '20', 'memberID': '1234',
+                  'borrowed_books': ['testbook']}
+        pat = patron.Patron.from_db(record)
+        pat.add_borrowed_book("otherbook")
+        self.assertEqual(record['borrowed_books'], ['testbook'])
+
+    def test_from_db_without_borrowed_books(self):
+        record = {'fname': 'fname', 'lname': 'lname', 'age': '20', 'memberID': '1234'}
+        self.assertEqual(patron.Patron.from_db(record), self.pat)
+
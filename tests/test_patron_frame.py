@@ -0,0 +1,82 @@
+import os
+import unittest
+
+from library import patron_frame
+from library.library_db_interface import Library_DB
+from library.patron import Patron
+from library.patron_frame import PatronFrame
+from library.patron_store import TinyDBPatronStore
+
+
+@unittest.skipIf(patron_frame.np is None, "numpy is not installed")
+class PatronFrameTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = os.path.join("tests_data", "test_frame_db.json")
+        self.db = Library_DB(store=TinyDBPatronStore(self.db_path))
+        rows = [("A1", 12, []), ("A2", 25, ["dune"]), ("A3", 37, ["dune", "emma", "ulysses"]),
+                ("A4", 41, ["emma"]), ("A5", 68, ["ulysses", "dune"])]
+        for memberID, age, books in rows:
+            patron = Patron("fname", "lname", age, memberID)
+            for book in books:
+                patron.add_borrowed_book(book)
+            self.db.insert_patron(patron)
+        self.frame = PatronFrame.from_db(self.db)
+
+    def tearDown(self):
+        self.db.close_db()
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+
+    def test_columns(self):
+        self.assertEqual(len(self.frame), 5)
+        self.assertEqual(self.frame.member_ids.tolist(), ["A1", "A2", "A3", "A4", "A5"])
+        self.assertEqual(self.frame.ages.tolist(), [12, 25, 37, 41, 68])
+        self.assertEqual(self.frame.offsets.tolist(), [0, 0, 1, 4, 5, 7])
+        self.assertEqual(self.frame.get_borrowed_books(2), ["dune", "emma", "ulysses"])
+
+    def test_borrow_counts(self):
+        self.assertEqual(self.frame.borrow_counts().tolist(), [0, 1, 3, 1, 2])
+
+    def test_age_histogram(self):
+        counts, edges = self.frame.age_histogram([0, 18, 65, 120])
+        self.assertEqual(counts.tolist(), [1, 3, 1])
+        self.assertEqual(edges.tolist(), [0, 18, 65, 120])
+
+    def test_borrow_count_distribution(self):
+        self.assertEqual(self.frame.borrow_count_distribution().tolist(), [1, 2, 1, 1])
+
+    def test_patrons_with_more_than(self):
+        self.assertEqual(self.frame.patrons_with_more_than(1).tolist(), ["A3", "A5"])
+        self.assertEqual(self.frame.patrons_with_more_than(3).tolist(), [])
+
+    def test_filter(self):
+        adults = self.frame.filter(self.frame.age_between(18, 65))
+        self.assertEqual(adults.member_ids.tolist(), ["A2", "A3", "A4"])
+        self.assertEqual(adults.offsets.tolist(), [0, 1, 4, 5])
+        self.assertEqual(adults.titles.tolist(), ["dune", "dune", "emma", "ulysses", "emma"])
+        self.assertEqual(adults.get_borrowed_books(1), ["dune", "emma", "ulysses"])
+
+    def test_bad_ages_left_out_of_age_reports(self):
+        for memberID, age in (("B1", ""), ("B2", "abc"), ("B3", None)):
+            self.db.insert_patron(Patron("fname", "lname", age, memberID))
+        frame = PatronFrame.from_db(self.db)
+        self.assertEqual(len(frame), 8)
+        self.assertEqual(frame.ages.tolist()[5:], [PatronFrame.AGE_UNKNOWN] * 3)
+        self.assertEqual(frame.has_age().tolist(), [True] * 5 + [False] * 3)
+        self.assertEqual(frame.age_histogram([-10, 18, 65, 120])[0].tolist(), [1, 3, 1])
+        self.assertEqual(frame.member_ids[frame.age_between(-10, 18)].tolist(), ["A1"])
+        self.assertEqual(frame.borrow_counts().tolist()[5:], [0, 0, 0])
+
+    def test_filter_nothing(self):
+        empty = self.frame.filter(self.frame.ages > 100)
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(empty.borrow_count_distribution().tolist(), [0])
+
+    def test_string_ages(self):
+        self.db.insert_patron(Patron("fname", "lname", "30", "A6"))
+        frame = PatronFrame.from_db(self.db)
+        self.assertEqual(frame.ages.tolist()[-1], 30)
+
+    def test_mismatched_columns(self):
+        self.assertRaises(ValueError, PatronFrame, ["A1"], [1, 2], [0, 0], [])
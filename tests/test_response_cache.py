@@ -0,0 +1,69 @@
+import unittest
+from library.response_cache import ResponseCache, normalize_url
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(maxsize=2, ttl=10, negative_ttl=2, clock=self.clock)
+
+    def test_miss_returns_default(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('a', 'default'), 'default')
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_hit(self):
+        self.cache.set('a', {'docs': []})
+        self.assertEqual(self.cache.get('a'), {'docs': []})
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_entry_expires_after_ttl(self):
+        self.cache.set('a', 1)
+        self.clock.now = 9.9
+        self.assertEqual(self.cache.get('a'), 1)
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_negative_result_cached_with_negative_ttl(self):
+        missing = object()
+        self.cache.set('a', None)
+        self.assertIsNone(self.cache.get('a', missing))
+        self.clock.now = 2
+        self.assertIs(self.cache.get('a', missing), missing)
+
+    def test_lru_eviction(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_zero_maxsize_disables_cache(self):
+        cache = ResponseCache(maxsize=0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+    def test_clear(self):
+        self.cache.set('a', 1)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_normalize_url_case_whitespace_and_order(self):
+        self.assertEqual(normalize_url('HTTP://OpenLibrary.org/search.json?q=Learning%20%20Python &limit=5'),
+                         normalize_url('http://openlibrary.org/search.json?limit=5&q=learning python'))
+
+    def test_normalize_url_different_queries(self):
+        self.assertNotEqual(normalize_url('http://x/search.json?q=a'),
+                            normalize_url('http://x/search.json?author=a'))
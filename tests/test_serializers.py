@@ -0,0 +1,122 @@
+import json
+import os
+import unittest
+
+from tinydb.storages import JSONStorage
+
+from library import library_db_interface as ldi
+from library import serializers
+from library.patron_store import TinyDBPatronStore
+from library.serializers import JSONSerializer, get_serializer
+from library.tinydb_storages import SerializedStorage
+from tests import test_library_db
+
+DATA = {'_default': {1: {'fname': 'Zoë', 'age': 36, 'memberID': 'A1', 'borrowed_books': ['notes']},
+                     '2': {'fname': 'Alan', 'age': None, 'memberID': 2, 'borrowed_books': []}}}
+# what comes back once the document IDs have been through JSON
+DECODED = {'_default': {'1': DATA['_default'][1], '2': DATA['_default']['2']}}
+
+
+class SerializerTests(unittest.TestCase):
+
+    def _available(self):
+        names = ['json']
+        if serializers.orjson is not None:
+            names.append('orjson')
+        if serializers.msgpack is not None:
+            names.append('msgpack')
+        return names
+
+    def test_round_trip(self):
+        for name in self._available():
+            with self.subTest(serializer=name):
+                serializer = get_serializer(name)
+                raw = serializer.dumps(DATA)
+                self.assertIsInstance(raw, bytes)
+                loaded = serializer.loads(raw)
+                self.assertEqual(loaded, DATA if name == 'msgpack' else DECODED)
+
+    @unittest.skipIf(serializers.orjson is None, "orjson is not installed")
+    def test_orjson_output_is_json(self):
+        self.assertEqual(json.loads(get_serializer('orjson').dumps(DATA)), DECODED)
+        self.assertEqual(get_serializer('orjson').loads(JSONSerializer().dumps(DATA)), DECODED)
+
+    @unittest.skipIf(serializers.orjson is None, "orjson is not installed")
+    def test_orjson_falls_back_for_big_ints(self):
+        data = {'_default': {'1': {'memberID': 2 ** 64, 'borrowed_books': []}}}
+        self.assertEqual(get_serializer('orjson').loads(get_serializer('orjson').dumps(data)), data)
+
+    def test_default(self):
+        expected = 'orjson' if serializers.orjson is not None else 'json'
+        self.assertEqual(get_serializer().name, expected)
+
+    def test_instance_passes_through(self):
+        serializer = JSONSerializer()
+        self.assertIs(get_serializer(serializer), serializer)
+
+    def test_unknown_name(self):
+        self.assertRaises(ValueError, get_serializer, 'yaml')
+
+
+class SerializedStorageTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join("tests_data", "test_serialized_db.json")
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_empty_file(self):
+        storage = SerializedStorage(self.path)
+        self.assertIsNone(storage.read())
+        storage.close()
+
+    def test_write_shrinks_file(self):
+        storage = SerializedStorage(self.path, serializer='json')
+        storage.write({'_default': {str(i): {'memberID': i} for i in range(50)}})
+        storage.write({'_default': {}})
+        self.assertEqual(storage.read(), {'_default': {}})
+        storage.close()
+
+    def test_readable_by_json_storage(self):
+        store = TinyDBPatronStore(self.path)
+        store.insert({'fname': 'Ada', 'lname': 'Lovelace', 'age': 36, 'memberID': 'A1', 'borrowed_books': ['notes']})
+        store.close()
+        storage = JSONStorage(self.path)
+        self.assertEqual(list(storage.read()['_default'].values())[0]['borrowed_books'], ['notes'])
+        storage.close()
+
+    def test_big_int_member_id(self):
+        store = TinyDBPatronStore(self.path)
+        store.insert({'fname': 'Ada', 'lname': 'Lovelace', 'age': 36, 'memberID': 2 ** 64, 'borrowed_books': []})
+        store.insert({'fname': 'Alan', 'lname': 'Turing', 'age': 41, 'memberID': 'T1', 'borrowed_books': []})
+        store.close()
+        store = TinyDBPatronStore(self.path)
+        self.assertEqual(store.count(), 2)
+        self.assertIsNotNone(store.get(2 ** 64))
+        store.close()
+
+
+class StdlibJSONLibraryDBTests(test_library_db.LibraryDBTests):
+    """Runs the Library_DB tests with the stdlib json serializer."""
+
+    def _open_db(self):
+        return ldi.Library_DB(store=TinyDBPatronStore(self.db_path, serializer='json'))
+
+
+@unittest.skipIf(serializers.msgpack is None, "msgpack is not installed")
+class MsgpackLibraryDBTests(test_library_db.LibraryDBTests):
+    """Runs the Library_DB tests with the msgpack serializer."""
+
+    def setUp(self):
+        self.msgpack_path = os.path.join("tests_data", "test_db.msgpack")
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        if os.path.exists(self.msgpack_path):
+            os.remove(self.msgpack_path)
+
+    def _open_db(self):
+        return ldi.Library_DB(store=TinyDBPatronStore(self.msgpack_path, serializer='msgpack'))
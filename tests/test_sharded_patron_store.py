@@ -0,0 +1,150 @@
+import os
+import unittest
+
+from library import library_db_interface as ldi
+from library.reshard import reshard
+from library.sharded_patron_store import ShardedPatronStore, shard_index, shard_path
+from tests import test_library_db
+
+
+def remove_shards(path, shards):
+    for index in range(shards):
+        if os.path.exists(shard_path(path, index)):
+            os.remove(shard_path(path, index))
+
+
+class ShardedLibraryDBTests(test_library_db.LibraryDBTests):
+    """Runs the Library_DB tests against four TinyDB shards."""
+
+    def setUp(self):
+        self.sharded_path = os.path.join("tests_data", "test_sharded_db.json")
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        remove_shards(self.sharded_path, 4)
+
+    def _open_db(self):
+        return ldi.Library_DB(store=ShardedPatronStore(self.sharded_path, 4))
+
+    # records come back grouped by shard, so these two compare without order
+
+    def test_batch_writes_visible_and_persisted(self):
+        with self.db.batch():
+            self.db.insert_patron(self._make_patron(memberID="B1"))
+            self.db.insert_patron(self._make_patron(memberID="B2"))
+            self.db.update_patron(self._make_patron(memberID="B1", borrowed=["book1"]))
+            self.assertEqual(self.db.get_patron_count(), 2)
+        self.db.close_db()
+        self.db = self._open_db()
+        self.assertEqual(self.db.get_patron_count(), 2)
+        books = dict((r["memberID"], r["borrowed_books"]) for r in self.db.get_all_patrons())
+        self.assertEqual(books, {"B1": ["book1"], "B2": []})
+
+    def test_iter_patrons_yields_patron_objects(self):
+        self.db.insert_patrons([self._make_patron(memberID="P%d" % i, fname="Name%d" % i) for i in range(3)])
+        patrons = self.db.iter_patrons(batch_size=2)
+        self.assertNotIsInstance(patrons, list)
+        patrons = dict((p.get_memberID(), p) for p in patrons)
+        self.assertTrue(all(isinstance(p, test_library_db.DummyPatron) for p in patrons.values()))
+        self.assertEqual(sorted(patrons), ["P0", "P1", "P2"])
+        self.assertEqual(patrons["P2"].get_fname(), "Name2")
+
+
+class ShardedPatronStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join("tests_data", "test_shards.json")
+        self.store = ShardedPatronStore(self.path, 4)
+
+    def tearDown(self):
+        self.store.close()
+        remove_shards(self.path, 4)
+        remove_shards(self.path, 2)
+
+    def _record(self, memberID, borrowed=None):
+        return {'fname': 'fname', 'lname': 'lname', 'age': 20, 'memberID': memberID,
+                'borrowed_books': borrowed or []}
+
+    def test_shard_path(self):
+        self.assertEqual(shard_path(os.path.join("data", "db.json"), 3), os.path.join("data", "db-03.json"))
+        self.assertEqual(shard_path("db.json", 15), "db-15.json")
+
+    def test_shard_index_is_stable(self):
+        # crc32(b"M1") is fixed, unlike hash("M1") which changes between runs
+        self.assertEqual(shard_index("M1", 16), 0x55d0238d % 16)
+        self.assertEqual(shard_index(7, 16), shard_index("7", 16))
+
+    def test_files_created(self):
+        for index in range(4):
+            self.assertTrue(os.path.exists(shard_path(self.path, index)))
+
+    def test_point_operations_touch_one_shard(self):
+        self.store.insert(self._record('M1', ['dune']))
+        owner = self.store.shard_for('M1')
+        self.assertEqual([shard.count() for shard in self.store.shards if shard is not owner], [0, 0, 0])
+        self.assertEqual(owner.get('M1')['borrowed_books'], ['dune'])
+        self.assertTrue(self.store.update('M1', self._record('M1', ['emma'])))
+        self.assertEqual(self.store.get('M1')['borrowed_books'], ['emma'])
+        self.assertTrue(self.store.delete('M1'))
+        self.assertEqual(owner.count(), 0)
+
+    def test_scans_fan_out(self):
+        records = [self._record('M%d' % i, ['book %d' % (i % 3)]) for i in range(40)]
+        self.store.insert_many(records)
+        self.assertGreater(sum(1 for shard in self.store.shards if shard.count()), 1)
+        self.assertEqual(self.store.count(), 40)
+        self.assertEqual(sorted(r['memberID'] for r in self.store.all()), sorted(r['memberID'] for r in records))
+        self.assertEqual(len(list(self.store.iter_records(7))), 40)
+        self.assertEqual(self.store.get_borrowers('book 0'), set('M%d' % i for i in range(0, 40, 3)))
+        self.assertEqual(self.store.count_borrowers('book 1'), 13)
+
+    def test_parallel_scans(self):
+        self.store.close()
+        self.store = ShardedPatronStore(self.path, 4, workers=4)
+        self.store.insert_many([self._record('M%d' % i, ['dune']) for i in range(20)])
+        self.assertEqual(self.store.count(), 20)
+        self.assertEqual(len(self.store.all()), 20)
+        self.assertEqual(self.store.count_borrowers('dune'), 20)
+
+    def test_insert_many_returns_ids_in_order(self):
+        ids = self.store.insert_many([self._record('M%d' % i) for i in range(10)])
+        self.assertEqual(len(ids), 10)
+        for i, doc_id in enumerate(ids):
+            shard = self.store.shard_for('M%d' % i)
+            self.assertEqual(shard.db.get(doc_id=doc_id)['memberID'], 'M%d' % i)
+
+    def test_no_shards(self):
+        self.assertRaises(ValueError, ShardedPatronStore, self.path, 0)
+
+    def test_reshard(self):
+        self.store.insert_many([self._record('M%d' % i, ['book %d' % i]) for i in range(30)])
+        self.store.close()
+        self.assertEqual(reshard(self.path, 4, 2), 30)
+        self.assertFalse(os.path.exists(shard_path(self.path, 2)))
+        self.assertFalse(os.path.exists(shard_path(self.path, 3)))
+        self.store = ShardedPatronStore(self.path, 2)
+        self.assertEqual(self.store.count(), 30)
+        for i in range(30):
+            self.assertEqual(self.store.shards[shard_index('M%d' % i, 2)].get('M%d' % i)['borrowed_books'],
+                             ['book %d' % i])
+
+    def test_reshard_refuses_wrong_shard_count(self):
+        self.store.insert_many([self._record('M%d' % i) for i in range(30)])
+        self.store.close()
+        self.assertRaises(ValueError, reshard, self.path, 2, 4)
+        self.assertRaises(ValueError, reshard, self.path, 5, 4)
+        self.store = ShardedPatronStore(self.path, 4)
+        self.assertEqual(self.store.count(), 30)
+
+    def test_reshard_refuses_misplaced_records(self):
+        self.store.close()
+        self.store = ShardedPatronStore(self.path, 3)
+        self.store.insert_many([self._record('M%d' % i) for i in range(30)])
+        self.store.close()
+        os.remove(shard_path(self.path, 2))
+        self.assertRaises(ValueError, reshard, self.path, 2, 4)
+        root, ext = os.path.splitext(self.path)
+        self.assertFalse(os.path.exists(shard_path(root + '.reshard' + ext, 0)))
+        self.store = ShardedPatronStore(self.path, 2)
+        self.assertGreater(self.store.count(), 0)
@@ -0,0 +1,46 @@
+import threading
+import time
+import unittest
+from library.single_flight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+
+    def test_returns_result(self):
+        self.assertEqual(self.flight.do('k', lambda: 42), 42)
+        self.assertEqual(self.flight.in_flight(), 0)
+
+    def test_concurrent_calls_coalesced(self):
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return 'done'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.flight.do('k', slow)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        while self.flight.in_flight() == 0:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['done'] * 8)
+
+    def test_error_raised_and_not_kept(self):
+        def fail():
+            raise ValueError('boom')
+        self.assertRaises(ValueError, self.flight.do, 'k', fail)
+        self.assertEqual(self.flight.do('k', lambda: 'ok'), 'ok')
+
+    def test_different_keys_not_coalesced(self):
+        self.assertEqual(self.flight.do('a', lambda: 1), 1)
+        self.assertEqual(self.flight.do('b', lambda: 2), 2)
@@ -0,0 +1,111 @@
+import io
+import os
+import unittest
+from unittest.mock import patch
+
+from library import cli
+from library.library import Library
+from library.library_db_interface import Library_DB
+from library.patron import Patron
+from library.patron_store import TinyDBPatronStore
+from library.snapshot_store import ReadOnlyStoreError, SnapshotPatronStore, write_snapshot
+
+
+class SnapshotPatronStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = os.path.join("tests_data", "test_snapshot_source.json")
+        self.path = os.path.join("tests_data", "test_db.snapshot")
+        self.db = Library_DB(store=TinyDBPatronStore(self.db_path))
+        ada = Patron("Ada", "Lovelace", 36, "A1")
+        ada.add_borrowed_book("Notes")
+        self.db.insert_patrons([ada, Patron("Alan", "Turing", 41, 7), Patron("Grace", "Hopper", 85, "7"),
+                                Patron("Zoë", "Ünicode", 30, "Ü1")])
+        self.assertEqual(self.db.export_snapshot(self.path), 4)
+        self.store = SnapshotPatronStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.db.close_db()
+        for path in (self.db_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_get(self):
+        self.assertEqual(self.store.get("A1"), {'fname': 'Ada', 'lname': 'Lovelace', 'age': 36,
+                                                'memberID': 'A1', 'borrowed_books': ['notes']})
+        self.assertEqual(self.store.get("Ü1")['fname'], "Zoë")
+        self.assertIsNone(self.store.get("B1"))
+
+    def test_int_and_str_ids_are_distinct(self):
+        self.assertEqual(self.store.get(7)['fname'], "Alan")
+        self.assertEqual(self.store.get("7")['fname'], "Grace")
+        self.assertFalse(self.store.contains(8))
+
+    def test_count_and_scan(self):
+        self.assertEqual(self.store.count(), 4)
+        self.assertEqual(sorted(str(r['memberID']) for r in self.store.all()), ["7", "7", "A1", "Ü1"])
+        self.assertEqual(self.store.get_borrowers("notes"), {"A1"})
+
+    def test_every_lookup_on_a_larger_snapshot(self):
+        records = [{'fname': 'f', 'lname': 'l', 'age': i, 'memberID': 'M%d' % i, 'borrowed_books': []}
+                   for i in range(500)]
+        write_snapshot(records, self.path)
+        store = SnapshotPatronStore(self.path)
+        try:
+            for i in range(500):
+                self.assertEqual(store.get('M%d' % i)['age'], i)
+            self.assertFalse(store.contains('M500'))
+            self.assertFalse(store.contains(''))
+        finally:
+            store.close()
+
+    def test_empty_snapshot(self):
+        write_snapshot([], self.path)
+        store = SnapshotPatronStore(self.path)
+        self.assertEqual(store.count(), 0)
+        self.assertIsNone(store.get("A1"))
+        store.close()
+
+    def test_read_only(self):
+        record = self.store.get("A1")
+        self.assertRaises(ReadOnlyStoreError, self.store.insert, record)
+        self.assertRaises(ReadOnlyStoreError, self.store.update, "A1", record)
+        self.assertRaises(ReadOnlyStoreError, self.store.delete, "A1")
+        db = Library_DB(store=self.store)
+        self.assertRaises(ReadOnlyStoreError, db.insert_patron, Patron("New", "Person", 20, "N1"))
+
+    def test_duplicate_member_ids_refused(self):
+        record = {'fname': 'f', 'lname': 'l', 'age': 1, 'memberID': 'D', 'borrowed_books': []}
+        self.assertRaises(ValueError, write_snapshot, [record, dict(record)], self.path)
+
+    def test_not_a_snapshot(self):
+        self.assertRaises(ValueError, SnapshotPatronStore, self.db_path)
+        empty = os.path.join("tests_data", "test_empty.snapshot")
+        open(empty, "w").close()
+        try:
+            self.assertRaises(ValueError, SnapshotPatronStore, empty)
+        finally:
+            os.remove(empty)
+
+    def test_replacing_keeps_open_snapshot_readable(self):
+        write_snapshot([], self.path)
+        self.assertEqual(self.store.get("A1")['fname'], "Ada")
+
+    def test_library_lookups(self):
+        library = Library(db=Library_DB(store=self.store), api=object())
+        self.assertTrue(library.is_patron_registered(Patron("Ada", "Lovelace", 36, "A1")))
+        self.assertFalse(library.is_patron_registered(Patron("Bob", "Smith", 36, "B1")))
+        self.assertEqual(library.db.retrieve_patron("A1").get_borrowed_books(), ["notes"])
+
+    def test_cli_snapshot(self):
+        self.store.close()
+        os.remove(self.path)
+        stderr = io.StringIO()
+        self.db.close_db()
+        with patch('sys.stderr', stderr):
+            cli.main(["snapshot", self.path, "--db", self.db_path])
+        self.assertIn("4 written", stderr.getvalue())
+        self.db = Library_DB(store=TinyDBPatronStore(self.db_path))
+        self.store = SnapshotPatronStore(self.path)
+        self.assertEqual(self.store.count(), 4)
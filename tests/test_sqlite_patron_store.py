@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import unittest
+
+from library import library_db_interface as ldi
+from library.migrate_db import migrate
+from library.patron_store import TinyDBPatronStore
+from library.sqlite_patron_store import SQLitePatronStore
+from tests import test_library_db
+
+
+def remove_sqlite(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+class SQLiteLibraryDBTests(test_library_db.LibraryDBTests):
+    """Runs the Library_DB tests against the SQLite backend."""
+
+    def setUp(self):
+        self.sqlite_path = os.path.join("tests_data", "test_db.sqlite3")
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        remove_sqlite(self.sqlite_path)
+
+    def _open_db(self):
+        return ldi.Library_DB(store=SQLitePatronStore(self.sqlite_path))
+
+
+class SQLitePatronStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join("tests_data", "test_store.sqlite3")
+        self.store = SQLitePatronStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        remove_sqlite(self.path)
+
+    def _record(self, memberID, borrowed=None, age=20):
+        return {'fname': 'f', 'lname': 'l', 'age': age, 'memberID': memberID,
+                'borrowed_books': borrowed or []}
+
+    def test_wal_mode(self):
+        mode = self.store.conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+    def test_borrowed_books_order_preserved(self):
+        self.store.insert(self._record('M1', ['c', 'a', 'b']))
+        self.assertEqual(self.store.get('M1')['borrowed_books'], ['c', 'a', 'b'])
+        self.store.update('M1', self._record('M1', ['a', 'd']))
+        self.assertEqual(self.store.get('M1')['borrowed_books'], ['a', 'd'])
+
+    def test_delete_removes_borrowed_books(self):
+        self.store.insert(self._record('M1', ['a']))
+        self.assertTrue(self.store.delete('M1'))
+        rows = self.store.conn.execute('SELECT COUNT(*) FROM borrowed_books').fetchone()[0]
+        self.assertEqual(rows, 0)
+
+    def test_count_kept_by_triggers(self):
+        self.store.insert(self._record('M1'))
+        self.store.insert_many([self._record('M2'), self._record('M3')])
+        self.assertRaises(sqlite3.IntegrityError, self.store.insert, self._record('M1'))
+        self.store.delete('M2')
+        self.store.delete('M9')
+        self.assertEqual(self.store.count(), 2)
+        with self.store.batch():
+            self.store.insert(self._record('M4'))
+            self.assertEqual(self.store.count(), 3)
+        self.store.close()
+        self.store = SQLitePatronStore(self.path)
+        self.assertEqual(self.store.count(), 3)
+
+    def test_count_of_database_without_counter(self):
+        self.store.insert_many([self._record('M%d' % i) for i in range(5)])
+        self.store.conn.executescript('DROP TRIGGER patron_count_insert; DROP TRIGGER patron_count_delete; '
+                                      'DROP TABLE patron_count;')
+        self.store.close()
+        self.store = SQLitePatronStore(self.path)
+        self.assertEqual(self.store.count(), 5)
+        self.store.insert(self._record('M5'))
+        self.assertEqual(self.store.count(), 6)
+
+    def test_value_types_kept(self):
+        self.store.insert(self._record(7, age='20'))
+        self.assertEqual(self.store.get(7)['age'], '20')
+        self.assertIsNone(self.store.get('7'))
+
+    def test_insert_many_and_all(self):
+        self.store.insert_many([self._record('A', ['x']), self._record('B'), self._record('C', ['y', 'z'])])
+        self.assertEqual(self.store.count(), 3)
+        self.assertEqual([(r['memberID'], r['borrowed_books']) for r in self.store.all()],
+                         [('A', ['x']), ('B', []), ('C', ['y', 'z'])])
+
+
+class MigrateDBTests(unittest.TestCase):
+
+    def setUp(self):
+        self.json_path = os.path.join("tests_data", "test_migrate.json")
+        self.sqlite_path = os.path.join("tests_data", "test_migrate.sqlite3")
+        source = TinyDBPatronStore(self.json_path)
+        source.insert({'fname': 'Ada', 'lname': 'Lovelace', 'age': 36, 'memberID': 'A1',
+                       'borrowed_books': ['notes']})
+        source.insert({'fname': 'Alan', 'lname': 'Turing', 'age': 41, 'memberID': 'A2',
+                       'borrowed_books': []})
+        source.close()
+
+    def tearDown(self):
+        os.remove(self.json_path)
+        remove_sqlite(self.sqlite_path)
+
+    def test_migrate(self):
+        self.assertEqual(migrate(self.json_path, self.sqlite_path), (2, 0))
+        store = SQLitePatronStore(self.sqlite_path)
+        records = store.all()
+        store.close()
+        self.assertEqual(records, [
+            {'fname': 'Ada', 'lname': 'Lovelace', 'age': 36, 'memberID': 'A1', 'borrowed_books': ['notes']},
+            {'fname': 'Alan', 'lname': 'Turing', 'age': 41, 'memberID': 'A2', 'borrowed_books': []}])
+
+    def test_migrate_twice_skips_existing(self):
+        migrate(self.json_path, self.sqlite_path)
+        self.assertEqual(migrate(self.json_path, self.sqlite_path), (0, 2))
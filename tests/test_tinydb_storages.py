@@ -0,0 +1,256 @@
+import json
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from tinydb import TinyDB
+from library import library_db_interface as ldi
+from library.patron_store import TinyDBPatronStore
+from library.tinydb_storages import AppendLogStorage, CachedStorageProxy, GroupCommitMiddleware
+from tests import test_library_db
+
+
+class GroupCommitMiddlewareTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join("tests_data", "test_group_commit.json")
+
+    def tearDown(self):
+        self.db.close()
+        os.remove(self.path)
+
+    def _open(self, **kwargs):
+        self.middleware = GroupCommitMiddleware(**kwargs)
+        self.db = TinyDB(self.path, storage=self.middleware)
+        # creating the default table is itself a write
+        self.middleware.flush()
+
+    def _on_disk(self):
+        with open(self.path) as f:
+            text = f.read()
+        return len(json.loads(text)['_default']) if text else 0
+
+    def test_default_writes_through(self):
+        self._open()
+        self.db.insert({'memberID': 1})
+        self.assertEqual(self._on_disk(), 1)
+        self.assertEqual(self.middleware.pending_writes(), 0)
+
+    def test_flush_on_size_threshold(self):
+        self._open(write_cache_size=3)
+        self.db.insert({'memberID': 1})
+        self.db.insert({'memberID': 2})
+        self.assertEqual(self._on_disk(), 0)
+        self.assertEqual(self.middleware.pending_writes(), 2)
+        self.db.insert({'memberID': 3})
+        self.assertEqual(self._on_disk(), 3)
+
+    def test_flush_on_time_threshold(self):
+        self._open(write_cache_size=1000, flush_interval=0.05)
+        self.db.insert({'memberID': 1})
+        self.assertEqual(self._on_disk(), 0)
+        deadline = time.time() + 2
+        while self._on_disk() == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self._on_disk(), 1)
+
+    def test_batch_defers_flush_until_end(self):
+        self._open()
+        with self.middleware.batch():
+            for i in range(5):
+                self.db.insert({'memberID': i})
+            self.assertEqual(self._on_disk(), 0)
+            self.assertEqual(len(self.db), 5)
+        self.assertEqual(self._on_disk(), 5)
+
+    def test_close_flushes(self):
+        self._open(write_cache_size=1000)
+        self.db.insert({'memberID': 1})
+        self.db.close()
+        self.assertEqual(self._on_disk(), 1)
+
+
+class CachedStorageProxyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join("tests_data", "test_cached_proxy.json")
+        self.db = TinyDB(self.path, storage=GroupCommitMiddleware(), storage_proxy_class=CachedStorageProxy)
+
+    def tearDown(self):
+        self.db.close()
+        os.remove(self.path)
+
+    def test_table_reused_between_operations(self):
+        self.db.insert({'memberID': 1})
+        first = self.db.get(doc_id=1)
+        self.assertIs(self.db.get(doc_id=1), first)
+
+    def test_operations_persist(self):
+        self.db.insert({'memberID': 1})
+        self.db.insert_multiple([{'memberID': 2}, {'memberID': 3}])
+        self.db.update({'age': 5}, doc_ids=[2])
+        self.db.remove(doc_ids=[1])
+        self.db.close()
+        self.db = TinyDB(self.path)
+        self.assertEqual(sorted(doc['memberID'] for doc in self.db.all()), [2, 3])
+        self.assertEqual(self.db.get(doc_id=2)['age'], 5)
+
+    def test_purge(self):
+        self.db.insert({'memberID': 1})
+        self.db.purge()
+        self.assertEqual(len(self.db), 0)
+        self.db.insert({'memberID': 2})
+        self.assertEqual(len(self.db), 1)
+
+
+class FailedWriteTests(unittest.TestCase):
+    """A TinyDBPatronStore whose storage fails to write once."""
+
+    def setUp(self):
+        self.path = os.path.join("tests_data", "test_failed_write.json")
+        self.store = TinyDBPatronStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        os.remove(self.path)
+
+    def _record(self, memberID, borrowed=None):
+        return {'fname': 'f', 'lname': 'l', 'age': 20, 'memberID': memberID,
+                'borrowed_books': borrowed or []}
+
+    def _fail_once(self):
+        return patch.object(self.store.middleware.storage, 'write', side_effect=OSError('disk full'))
+
+    def test_retried_insert_not_duplicated(self):
+        with self._fail_once():
+            self.assertRaises(OSError, self.store.insert, self._record('M1'))
+        self.assertFalse(self.store.contains('M1'))
+        self.assertEqual(self.store.all(), [])
+        self.store.insert(self._record('M1'))
+        self.store.close()
+        self.store = TinyDBPatronStore(self.path)
+        self.assertEqual(self.store.count(), 1)
+        self.assertEqual(len(self.store.all()), 1)
+
+    def test_failed_update_rolled_back(self):
+        self.store.insert(self._record('M1', ['dune']))
+        with self._fail_once():
+            self.assertRaises(OSError, self.store.update, 'M1', self._record('M1', ['emma']))
+        self.assertEqual(self.store.get('M1')['borrowed_books'], ['dune'])
+        self.assertEqual(self.store.get_borrowers('dune'), {'M1'})
+        self.assertEqual(self.store.get_borrowers('emma'), set())
+
+
+class AppendLogLibraryDBTests(test_library_db.LibraryDBTests):
+    """Runs the Library_DB tests against TinyDB on an AppendLogStorage."""
+
+    def tearDown(self):
+        super().tearDown()
+        for suffix in ('.log', '.log.old'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+    def _open_db(self):
+        return ldi.Library_DB(store=TinyDBPatronStore(self.db_path, storage=AppendLogStorage))
+
+
+class AppendLogStorageTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join("tests_data", "test_append_log.json")
+        self.store = self._open()
+
+    def tearDown(self):
+        self.store.close()
+        for suffix in ('', '.log', '.log.old'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def _open(self, **kwargs):
+        return TinyDBPatronStore(self.path, storage=AppendLogStorage, **kwargs)
+
+    def _record(self, memberID, borrowed=None):
+        return {'fname': 'f', 'lname': 'l', 'age': 20, 'memberID': memberID,
+                'borrowed_books': borrowed or []}
+
+    def _log_lines(self):
+        with open(self.path + '.log') as f:
+            return [json.loads(line) for line in f]
+
+    def test_mutations_are_appended(self):
+        snapshot_size = os.path.getsize(self.path)
+        self.store.insert(self._record('A'))
+        self.store.update('A', self._record('A', ['book']))
+        self.store.delete('A')
+        self.assertEqual(os.path.getsize(self.path), snapshot_size)
+        self.assertEqual([entry['op'] for entry in self._log_lines()], ['u', 'u', 'd'])
+        self.assertEqual(self._log_lines()[1]['doc']['borrowed_books'], ['book'])
+
+    def test_replay_on_open(self):
+        self.store.insert(self._record('A'))
+        self.store.insert_many([self._record('B'), self._record('C')])
+        self.store.update('B', self._record('B', ['book']))
+        self.store.delete('A')
+        self.store.close()
+        self.store = self._open()
+        self.assertEqual(self.store.count(), 2)
+        self.assertEqual(self.store.get('B')['borrowed_books'], ['book'])
+        self.assertIsNone(self.store.get('A'))
+
+    def test_torn_last_entry_ignored(self):
+        self.store.insert(self._record('A'))
+        self.store.close()
+        with open(self.path + '.log', 'a') as f:
+            f.write('{"op": "u", "t": "_default", "id": 2, "doc": {"memb')
+        self.store = self._open()
+        self.assertEqual(self.store.count(), 1)
+        self.store.insert(self._record('C'))
+        self.store.update('A', self._record('A', ['book']))
+        self.store.close()
+        self.store = self._open()
+        self.assertEqual(sorted(r['memberID'] for r in self.store.all()), ['A', 'C'])
+        self.assertEqual(self.store.get('A')['borrowed_books'], ['book'])
+
+    def test_compaction(self):
+        self.store.close()
+        self.store = self._open()
+        self.store.middleware.storage.compact_threshold = 512
+        for i in range(20):
+            self.store.insert(self._record('M%d' % i, ['book']))
+        self.store.middleware.storage.wait_for_compaction()
+        self.assertLess(os.path.getsize(self.path + '.log'), 512)
+        with open(self.path) as f:
+            self.assertGreater(len(json.load(f)['_default']), 0)
+        self.store.close()
+        self.store = self._open()
+        self.assertEqual(self.store.count(), 20)
+
+    def test_recovers_from_interrupted_compaction(self):
+        self.store.insert(self._record('A'))
+        self.store.close()
+        os.replace(self.path + '.log', self.path + '.log.old')
+        self.store = self._open()
+        self.store.insert(self._record('B'))
+        self.store.close()
+        self.store = self._open()
+        self.assertEqual(sorted(r['memberID'] for r in self.store.all()), ['A', 'B'])
+
+    def test_plain_tinydb_writes_snapshot(self):
+        self.store.close()
+        db = TinyDB(self.path, storage=AppendLogStorage)
+        db.insert({'memberID': 'A'})
+        db.insert({'memberID': 'B'})
+        db.close()
+        self.store = self._open()
+        self.assertEqual(self.store.count(), 2)
+
+    def test_plain_tinydb_write_saved_before_close(self):
+        self.store.insert(self._record('A'))
+        self.store.close()
+        db = TinyDB(self.path, storage=AppendLogStorage)
+        db.insert({'memberID': 'B'})
+        # reopened without closing db, as after a crash
+        self.store = self._open()
+        self.assertEqual(sorted(r['memberID'] for r in self.store.all()), ['A', 'B'])
+        db._storage._log.close()